@@ -0,0 +1,171 @@
+"""
+Stand-in LLM server for benchmarks.
+
+Speaks the OpenAI-compatible chat-completions protocol that the Groq client
+uses (POST /openai/v1/chat/completions, streaming and non-streaming), so the
+API can be load tested without spending real quota. Response time is
+latency (sampled per request) + output tokens / tokens-per-second.
+
+    python bench/fake_llm.py --port 9100 --latency-ms 400 --latency-dist lognormal --error-429-rate 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FILLER = (
+    "Thank you for the draft. The main argument is clear, and a few specific examples "
+    "would make it stronger. Consider tightening the introduction and linking each "
+    "paragraph back to your thesis."
+).split()
+
+
+@dataclass
+class FakeLLMSettings:
+    latency_ms: float = 300.0
+    latency_dist: str = "lognormal"  # fixed | uniform | lognormal
+    latency_sigma: float = 0.5
+    tokens_per_s: float = 400.0
+    output_tokens: int = 120
+    think_rate: float = 0.0
+    think_tokens: int = 40
+    error_429_rate: float = 0.0
+    seed: int | None = None
+    rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    def latency_s(self) -> float:
+        """Time to first token. latency_ms is the median for lognormal, the mean for uniform."""
+        base = self.latency_ms / 1000.0
+        if self.latency_dist == "fixed":
+            return base
+        if self.latency_dist == "uniform":
+            return self.rng.uniform(0, 2 * base)
+        return self.rng.lognormvariate(0, self.latency_sigma) * base
+
+    def tokens(self, prompt: str) -> list[str]:
+        words = [w for w in prompt.split() if w.isalpha()][-20:] or FILLER
+        out = [(words + FILLER)[i % (len(words) + len(FILLER))] for i in range(self.output_tokens)]
+        if self.think_rate and self.rng.random() < self.think_rate:
+            think = [FILLER[i % len(FILLER)] for i in range(self.think_tokens)]
+            out = ["<think>"] + think + ["</think>"] + out
+        return [t + " " for t in out]
+
+
+def create_app(settings: FakeLLMSettings) -> FastAPI:
+    app = FastAPI()
+    counters = {"requests": 0, "streams": 0, "rate_limited": 0}
+
+    def rate_limited():
+        counters["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_exceeded", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": "1"},
+        )
+
+    @app.post("/openai/v1/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+        if settings.error_429_rate and settings.rng.random() < settings.error_429_rate:
+            return rate_limited()
+
+        model = body.get("model", "fake")
+        prompt = (body.get("messages") or [{}])[-1].get("content") or ""
+        tokens = settings.tokens(prompt)
+        usage = {
+            "prompt_tokens": max(1, len(prompt) // 4),
+            "completion_tokens": len(tokens),
+            "total_tokens": max(1, len(prompt) // 4) + len(tokens),
+        }
+        created = int(time.time())
+        latency = settings.latency_s()
+
+        if body.get("stream"):
+            counters["streams"] += 1
+
+            async def events():
+                await asyncio.sleep(latency)
+                interval = 1.0 / settings.tokens_per_s if settings.tokens_per_s > 0 else 0
+                for token in tokens:
+                    chunk = {
+                        "id": "fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if interval:
+                        await asyncio.sleep(interval)
+                done = {
+                    "id": "fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        generation = len(tokens) / settings.tokens_per_s if settings.tokens_per_s > 0 else 0
+        await asyncio.sleep(latency + generation)
+        return {
+            "id": "fake", "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens).strip()}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    return app
+
+
+def add_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--latency-ms", type=float, default=300.0, help="Median (lognormal) / mean (uniform) time to first token")
+    ap.add_argument("--latency-dist", choices=("fixed", "uniform", "lognormal"), default="lognormal")
+    ap.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal spread")
+    ap.add_argument("--tokens-per-s", type=float, default=400.0, help="Output token rate (0 = instant)")
+    ap.add_argument("--output-tokens", type=int, default=120)
+    ap.add_argument("--think-rate", type=float, default=0.0, help="Fraction of answers starting with a <think> block")
+    ap.add_argument("--think-tokens", type=int, default=40)
+    ap.add_argument("--error-429-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 429")
+    ap.add_argument("--seed", type=int, default=None)
+
+
+def settings_from_args(args) -> FakeLLMSettings:
+    return FakeLLMSettings(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        tokens_per_s=args.tokens_per_s,
+        output_tokens=args.output_tokens,
+        think_rate=args.think_rate,
+        think_tokens=args.think_tokens,
+        error_429_rate=args.error_429_rate,
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description="OpenAI-compatible stand-in LLM server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    add_arguments(ap)
+    args = ap.parse_args()
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
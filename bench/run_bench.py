@@ -0,0 +1,294 @@
+"""
+Load-test the API against a stand-in LLM and an in-memory (or local) Mongo.
+
+Starts bench/fake_llm.py and the real app (bench/serve_app.py) as
+subprocesses, drives each scenario with a fixed number of concurrent
+clients for --duration seconds, and reports p50/p95/p99 latency and
+requests per second per operation. Results are written to
+bench/results/<stamp>/results.json; compare them with a saved baseline:
+
+    python bench/run_bench.py --save-baseline bench/baseline.json
+    python bench/run_bench.py --baseline bench/baseline.json      # exits 1 on a regression
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import yaml
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+SCENARIOS = ("interpret", "records", "auth")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+def summarize(samples: list[tuple[float, int]], elapsed: float) -> dict:
+    latencies = sorted(s for s, _ in samples)
+    errors = sum(1 for _, code in samples if code >= 400 or code == 0)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+    }
+
+
+def load_texts() -> list[str]:
+    path = REPO_DIR / "eval" / "data" / "examples.jsonl"
+    with path.open("r", encoding="utf-8") as f:
+        return [json.loads(line)["input"] for line in f if line.strip()]
+
+
+def write_bench_model_config(path: Path, keep_rate_limits: bool) -> Path:
+    """Copy of model_config.yaml for the run; rate limits are off unless kept, or they would cap throughput."""
+    cfg = yaml.safe_load((REPO_DIR / "server" / "app" / "model_config.yaml").read_text(encoding="utf-8"))
+    if not keep_rate_limits:
+        cfg.setdefault("rate_limits", {})["enabled"] = False
+    path.write_text(yaml.safe_dump(cfg, sort_keys=False), encoding="utf-8")
+    return path
+
+
+class Operation:
+    """Times one request and files it under a label."""
+
+    def __init__(self, samples: dict[str, list]):
+        self.samples = samples
+
+    async def __call__(self, label: str, request):
+        start = time.perf_counter()
+        try:
+            resp = await request
+            code = resp.status_code
+        except httpx.HTTPError:
+            resp, code = None, 0
+        self.samples.setdefault(label, []).append((time.perf_counter() - start, code))
+        return resp
+
+
+async def interpret_op(client: httpx.AsyncClient, op: Operation, rng: random.Random, args, texts: list[str]):
+    text = rng.choice(texts)
+    if rng.random() >= args.cache_hit_ratio:
+        text = f"{text} ({uuid.uuid4().hex[:8]})"  # unique text, so the LLM is called
+    body = {"text": text, "options": {"soften": True}, "model": args.model}
+    await op("interpret", client.post("/api/interpret", json=body))
+
+
+async def records_op(client: httpx.AsyncClient, op: Operation, rng: random.Random, args, texts: list[str]):
+    resp = await op("records.page", client.get("/api/feedback-records", params={"limit": 50}))
+    if resp is not None and resp.status_code == 200 and resp.json().get("next_cursor"):
+        await op("records.next_page", client.get(
+            "/api/feedback-records", params={"limit": 50, "cursor": resp.json()["next_cursor"]}
+        ))
+
+
+async def auth_op(client: httpx.AsyncClient, op: Operation, rng: random.Random, args, texts: list[str]):
+    submission_id = f"bench-{uuid.uuid4().hex}"
+    await op("auth.signup", client.post("/api/auth/signup", json={"submission_id": submission_id, "password": "bench-password"}))
+    await op("auth.login", client.post("/api/auth/login", json={"submission_id": submission_id, "password": "bench-password"}))
+
+
+OPERATIONS = {"interpret": interpret_op, "records": records_op, "auth": auth_op}
+
+
+async def seed_records(client: httpx.AsyncClient, texts: list[str], count: int, model: str):
+    """Fill feedback_records through the batch endpoint so the records scenario has pages to read."""
+    for start in range(0, count, 100):
+        items = [{"text": f"{texts[i % len(texts)]} (seed {i})", "options": {"simplify": True}}
+                 for i in range(start, min(count, start + 100))]
+        resp = await client.post("/api/interpret/batch", json={"items": items, "model": model}, timeout=300)
+        resp.raise_for_status()
+    await asyncio.sleep(1.0)  # records written by the write-behind buffer
+
+
+async def run_scenario(base_url: str, name: str, args, texts: list[str]) -> dict:
+    samples: dict[str, list] = {}
+    op = Operation(samples)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+
+        async def worker(seed: int, until: float):
+            rng = random.Random(seed)
+            while time.perf_counter() < until:
+                await OPERATIONS[name](client, op, rng, args, texts)
+
+        if args.warmup > 0:
+            until = time.perf_counter() + args.warmup
+            await asyncio.gather(*(worker((args.seed or 0) + i, until) for i in range(args.concurrency)))
+            samples.clear()
+
+        start = time.perf_counter()
+        until = start + args.duration
+        await asyncio.gather(*(worker((args.seed or 0) + 1000 + i, until) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return {label: summarize(s, elapsed) for label, s in samples.items()}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lines describing each shared operation's change; regressions are prefixed with REGRESSION."""
+    lines = []
+    for label, current in results["operations"].items():
+        base = baseline.get("operations", {}).get(label)
+        if not base:
+            continue
+        p95_change = (current["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        rps_change = (current["rps"] - base["rps"]) / base["rps"] if base["rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        lines.append(
+            f"{'REGRESSION ' if regressed else ''}{label}: p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms "
+            f"({p95_change:+.0%}), rps {base['rps']:.1f} -> {current['rps']:.1f} ({rps_change:+.0%})"
+        )
+    return lines
+
+
+def print_table(operations: dict):
+    print(f"{'operation':<20}{'requests':>10}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, r in operations.items():
+        print(f"{label:<20}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+
+def wait_until_up(url: str, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}; see the logs in the run directory")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the API against a stand-in LLM")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20.0, help="Measured seconds per scenario")
+    ap.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each scenario")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--model", default="llama-3.1-8b-instant")
+    ap.add_argument("--cache-hit-ratio", type=float, default=0.0, help="Fraction of interpret calls that repeat a known text")
+    ap.add_argument("--seed-records", type=int, default=500, help="Records created before the records scenario")
+    ap.add_argument("--mongo-url", default=None, help="Real MongoDB for the app (default: in-memory)")
+    ap.add_argument("--keep-rate-limits", action="store_true", help="Leave the app's rate_limits policies on")
+    ap.add_argument("--bcrypt-rounds", type=int, default=None, help="BCRYPT_ROUNDS for the app")
+    ap.add_argument("--outdir", default=str(BENCH_DIR / "results"))
+    ap.add_argument("--baseline", default=None, help="results.json to compare against")
+    ap.add_argument("--save-baseline", default=None, help="Also write this run's results here")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="Allowed p95 increase / rps drop vs. baseline")
+    fake = ap.add_argument_group("stand-in LLM")
+    sys.path.insert(0, str(BENCH_DIR))
+    from fake_llm import add_arguments
+    add_arguments(fake)
+    args = ap.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    run_dir = Path(args.outdir) / datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    llm_port, app_port = free_port(), free_port()
+
+    fake_cmd = [sys.executable, str(BENCH_DIR / "fake_llm.py"), "--port", str(llm_port)]
+    for name in ("latency_ms", "latency_dist", "latency_sigma", "tokens_per_s", "output_tokens",
+                 "think_rate", "think_tokens", "error_429_rate", "seed"):
+        if getattr(args, name) is not None:
+            fake_cmd += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+
+    env = {
+        **os.environ,
+        "GROQ_API_KEY": "bench",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{llm_port}",
+        "MODEL_CONFIG_FILE": str(write_bench_model_config(run_dir / "model_config.yaml", args.keep_rate_limits)),
+        "RECORD_JOURNAL_FILE": str(run_dir / "feedback_journal.jsonl"),
+    }
+    if args.bcrypt_rounds:
+        env["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    app_cmd = [sys.executable, str(BENCH_DIR / "serve_app.py"), "--port", str(app_port)]
+    if args.mongo_url:
+        app_cmd += ["--mongo-url", args.mongo_url]
+
+    procs = []
+    try:
+        with (run_dir / "fake_llm.log").open("w") as llm_log, (run_dir / "app.log").open("w") as app_log:
+            procs.append(subprocess.Popen(fake_cmd, stdout=llm_log, stderr=subprocess.STDOUT))
+            wait_until_up(f"http://127.0.0.1:{llm_port}/stats", procs[-1])
+            procs.append(subprocess.Popen(app_cmd, env=env, cwd=str(REPO_DIR / "server"), stdout=app_log, stderr=subprocess.STDOUT))
+            base_url = f"http://127.0.0.1:{app_port}"
+            wait_until_up(f"{base_url}/api/health", procs[-1])
+
+            texts = load_texts()
+            operations = {}
+
+            async def run_all():
+                for name in scenarios:
+                    if name == "records" and args.seed_records:
+                        async with httpx.AsyncClient(base_url=base_url) as client:
+                            await seed_records(client, texts, args.seed_records, args.model)
+                    print(f"Running {name} (concurrency {args.concurrency}, {args.duration:.0f}s)...")
+                    operations.update(await run_scenario(base_url, name, args, texts))
+
+            asyncio.run(run_all())
+            llm_stats = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "outdir")},
+        "llm": llm_stats,
+        "operations": operations,
+    }
+    (run_dir / "results.json").write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print_table(operations)
+    print(f"Results: {run_dir / 'results.json'}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        lines = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        print("\nCompared with baseline:")
+        for line in lines:
+            print("  " + line)
+        if any(line.startswith("REGRESSION") for line in lines):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
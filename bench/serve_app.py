@@ -0,0 +1,49 @@
+"""
+Run the API for a benchmark: the real FastAPI app under uvicorn, with Mongo
+either at --mongo-url or replaced by an in-memory mongomock database.
+Point it at bench/fake_llm.py with GROQ_BASE_URL (run_bench.py does this).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent / "server"
+
+
+def use_in_memory_mongo():
+    import mongomock_motor
+    import app.mongodb as mongodb
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    mongodb.client = client
+    mongodb.database = client.feedback_db
+    mongodb.feedback_records_collection = mongodb.database.feedback_records
+    mongodb.interpret_cache_collection = mongodb.database.interpret_cache
+    mongodb.rate_limits_collection = mongodb.database.rate_limits
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--mongo-url", default=None, help="Real MongoDB to use (default: in-memory mongomock)")
+    args = ap.parse_args()
+
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    sys.path.insert(0, str(SERVER_DIR))
+    if not args.mongo_url:
+        # Must run before app.main imports the collection handles
+        use_in_memory_mongo()
+
+    import uvicorn
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
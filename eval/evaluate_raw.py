@@ -7,13 +7,7 @@ from typing import Dict, Any, List
 
 import pandas as pd
 
-from metrics import (
-    bertscore_f1,
-    simplify_metrics,
-    simplify_composite,
-    soften_metrics,
-    soften_composite,
-)
+from metrics import configure_bertscore, metric_rows
 
 
 def load_jsonl(path: Path) -> List[Dict[str, Any]]:
@@ -29,8 +23,12 @@ def load_jsonl(path: Path) -> List[Dict[str, Any]]:
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--raw", required=True, help="Path to raw_outputs.jsonl")
+    ap.add_argument("--data", default="eval/data/examples.jsonl", help="Dataset the outputs were generated from (for its input feature store)")
     ap.add_argument("--outdir", default=None, help="Output directory for metrics.csv and summary.csv")
     ap.add_argument("--bertscore_min", type=float, default=0.85)
+    ap.add_argument("--bertscore_batch_size", type=int, default=None, help="Pairs per BERTScore batch (default: BERTSCORE_BATCH_SIZE or 64)")
+    ap.add_argument("--bertscore_threads", type=int, default=None, help="Torch CPU threads for BERTScore (default: BERTSCORE_THREADS or torch's choice)")
+    ap.add_argument("--toxicity_memo", default=None, help="Detoxify scores by text hash, reused across evals (default: toxicity_memo.json in the parent of --outdir)")
     args = ap.parse_args()
 
     raw_path = Path(args.raw)
@@ -38,64 +36,15 @@ def main():
     outdir.mkdir(parents=True, exist_ok=True)
 
     raw_rows = load_jsonl(raw_path)
-    metric_rows = []
 
     try:
         import detoxify  # noqa: F401
     except Exception:
         print("[warn] detoxify not installed -> toxicity metrics may be NaN")
 
-    for rec in raw_rows:
-        run = rec["run"]
-        provider = rec["provider"]
-        model = rec["model"]
-        task = rec["task"]
-        ex_id = rec["id"]
-        inp = rec["input"]
-        out = rec.get("output", "")
-        err = rec.get("error", "")
-
-        row: Dict[str, Any] = {
-            "run": run,
-            "provider": provider,
-            "model": model,
-            "task": task,
-            "id": ex_id,
-            "error": err,
-            "input_len": len(inp),
-            "output_len": len(out),
-        }
-
-        if task not in ("simplify", "soften"):
-            continue
-
-        if not out.strip() or err:
-            row.update(
-                {
-                    "bertscore_f1": float("nan"),
-                    "passes_semantic": False,
-                    "composite": float("nan"),
-                }
-            )
-            metric_rows.append(row)
-            continue
-
-        bs = bertscore_f1(inp, out)
-        row["bertscore_f1"] = bs
-        row["passes_semantic"] = bool(bs >= args.bertscore_min)
-
-        if task == "simplify":
-            sm = simplify_metrics(inp, out)
-            row.update(sm)
-            row["composite"] = simplify_composite(row) if row["passes_semantic"] else float("nan")
-        else:
-            tm = soften_metrics(inp, out)
-            row.update(tm)
-            row["composite"] = soften_composite(row) if row["passes_semantic"] else float("nan")
-
-        metric_rows.append(row)
-
-    df = pd.DataFrame(metric_rows)
+    toxicity_memo = Path(args.toxicity_memo) if args.toxicity_memo else outdir.parent / "toxicity_memo.json"
+    configure_bertscore(batch_size=args.bertscore_batch_size, threads=args.bertscore_threads)
+    df = pd.DataFrame(metric_rows(raw_rows, bertscore_min=args.bertscore_min, toxicity_memo=toxicity_memo, examples=Path(args.data)))
 
     metrics_path = outdir / "metrics.csv"
     summary_path = outdir / "summary.csv"
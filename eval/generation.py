@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from providers.base import GenParams, Provider
+
+
+@dataclass
+class GenJob:
+    run: str
+    provider: str
+    model: str
+    prompt: str
+    params: GenParams
+
+
+@dataclass
+class GenResult:
+    output: str
+    error: str = ""
+    attempts: int = 1
+    cached: bool = False
+
+
+class GenerationCache:
+    """
+    Content-addressed on-disk store of provider outputs, one JSON file per
+    sha256 of (provider, model, rendered prompt, GenParams). Only temperature-0
+    jobs are looked up and stored unless all_temperatures is set, since reusing
+    a sample at temperature > 0 would hide run-to-run variance.
+    """
+
+    def __init__(self, root: Path, all_temperatures: bool = False):
+        self.root = Path(root)
+        self.all_temperatures = all_temperatures
+
+    def applies(self, job: GenJob) -> bool:
+        return self.all_temperatures or float(job.params.temperature) == 0.0
+
+    def key(self, job: GenJob) -> str:
+        payload = {"provider": job.provider, "model": job.model, "prompt": job.prompt, "params": asdict(job.params)}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, job: GenJob) -> Optional[str]:
+        path = self._path(self.key(job))
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["output"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, job: GenJob, output: str) -> None:
+        path = self._path(self.key(job))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "provider": job.provider,
+            "model": job.model,
+            "params": asdict(job.params),
+            "output": output,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Limiter:
+    """
+    Concurrency caps per provider and per model, plus a request-rate token bucket
+    per model, configured by the `concurrency` section of runs.yaml. A model
+    without its own entry uses `models.default`.
+    """
+
+    def __init__(self, cfg: Dict[str, Any] | None = None):
+        cfg = cfg or {}
+        self.provider_cfg = cfg.get("providers") or {}
+        self.model_cfg = cfg.get("models") or {}
+        self.lock = threading.Lock()
+        self.semaphores: Dict[Tuple[str, str], threading.Semaphore] = {}
+        self.buckets: Dict[str, Optional[TokenBucket]] = {}
+
+    def _model_setting(self, model: str, key: str):
+        own = self.model_cfg.get(model) or {}
+        return own.get(key, (self.model_cfg.get("default") or {}).get(key))
+
+    def _semaphore(self, kind: str, name: str, limit) -> Optional[threading.Semaphore]:
+        if not limit:
+            return None
+        with self.lock:
+            sem = self.semaphores.get((kind, name))
+            if sem is None:
+                sem = self.semaphores[(kind, name)] = threading.Semaphore(int(limit))
+            return sem
+
+    def _bucket(self, model: str) -> Optional[TokenBucket]:
+        with self.lock:
+            if model not in self.buckets:
+                rpm = self._model_setting(model, "requests_per_minute")
+                burst = self._model_setting(model, "burst") or 1
+                self.buckets[model] = TokenBucket(float(rpm) / 60.0, float(burst)) if rpm else None
+            return self.buckets[model]
+
+    @contextmanager
+    def slot(self, provider: str, model: str):
+        held = [
+            s for s in (
+                self._semaphore("provider", provider, (self.provider_cfg.get(provider) or {}).get("max_concurrency")),
+                self._semaphore("model", model, self._model_setting(model, "max_concurrency")),
+            ) if s is not None
+        ]
+        for sem in held:
+            sem.acquire()
+        try:
+            bucket = self._bucket(model)
+            if bucket is not None:
+                bucket.acquire()
+            yield
+        finally:
+            for sem in reversed(held):
+                sem.release()
+
+
+def _status_code(e: Exception) -> Optional[int]:
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(e: Exception) -> bool:
+    """Rate limits (429) and server-side errors (5xx) are worth retrying."""
+    status = _status_code(e)
+    return status == 429 or (status is not None and status >= 500)
+
+
+def generate_one(
+    provider: Provider,
+    job: GenJob,
+    limiter: Limiter,
+    max_retries: int = 6,
+    backoff_s: float = 2.0,
+    max_backoff_s: float = 60.0,
+    cache: Optional[GenerationCache] = None,
+) -> GenResult:
+    """One generation with retries: honors Retry-After, else exponential backoff with jitter."""
+    use_cache = cache is not None and cache.applies(job)
+    if use_cache:
+        hit = cache.get(job)
+        if hit is not None:
+            return GenResult(output=hit, attempts=0, cached=True)
+
+    for attempt in range(max_retries + 1):
+        try:
+            with limiter.slot(job.provider, job.model):
+                out = provider.generate(model=job.model, prompt=job.prompt, params=job.params)
+            if use_cache:
+                cache.put(job, out)
+            return GenResult(output=out, attempts=attempt + 1)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                return GenResult(output="", error=repr(e), attempts=attempt + 1)
+            delay = _retry_after(e) or backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5)
+            time.sleep(min(delay, max_backoff_s))
+    raise AssertionError("unreachable")
+
+
+def generate_ordered(
+    jobs: List[GenJob],
+    get_provider: Callable[[str], Provider],
+    limiter: Limiter,
+    workers: int = 8,
+    max_retries: int = 6,
+    backoff_s: float = 2.0,
+    cache: Optional[GenerationCache] = None,
+    on_result: Optional[Callable[[int, GenJob, GenResult], None]] = None,
+) -> Iterator[Tuple[GenJob, GenResult]]:
+    """
+    Run all jobs on a thread pool and yield (job, result) in the order of `jobs`,
+    whichever request finishes first. Results are yielded as soon as every
+    earlier job is done, so callers can write them out incrementally.
+    on_result(index, job, result) is called from the worker thread as each job
+    finishes, in completion order (e.g. to journal results before they are yielded).
+    """
+    def run(index: int, job: GenJob) -> GenResult:
+        result = generate_one(get_provider(job.provider), job, limiter, max_retries, backoff_s, cache=cache)
+        if on_result is not None:
+            on_result(index, job, result)
+        return result
+
+    # Submitted here rather than on the first next(), so generation starts
+    # while the caller is still busy with work that needs no results
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gen")
+    futures = [pool.submit(run, i, job) for i, job in enumerate(jobs)]
+
+    def drain() -> Iterator[Tuple[GenJob, GenResult]]:
+        try:
+            for job, future in zip(jobs, futures):
+                yield job, future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return drain()
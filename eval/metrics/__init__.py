@@ -1,5 +1,6 @@
 from __future__ import annotations
 
-from .shared import bertscore_f1
+from .shared import bertscore_f1, bertscore_f1_batch, configure_bertscore
 from .simplify_metrics import simplify_metrics, simplify_composite
-from .soften_metrics import soften_metrics, soften_composite
\ No newline at end of file
+from .soften_metrics import soften_metrics, soften_composite
+from .scoring import metric_rows
\ No newline at end of file
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from .simplify_metrics import simplify_input_features
+from .soften_metrics import DETOXIFY_MODEL, score_toxicity, soften_input_features
+
+# Input-side features per task: the in_* values simplify_metrics / soften_metrics
+# would otherwise recompute for the same example in every run
+INPUT_FEATURES: Dict[str, Tuple[Callable[[str], Dict[str, float]], Tuple[str, ...]]] = {
+    "simplify": (simplify_input_features, ("in_num_words", "in_avg_word_len", "in_flesch_ease", "in_fk_grade")),
+    "soften": (soften_input_features, ("in_vader_compound", "in_toxicity", "polite_markers_in", "profanity_in")),
+}
+
+# Sources the stored values depend on; editing any of them invalidates every store
+_CODE_FILES = ("shared.py", "simplify_metrics.py", "soften_metrics.py", "features.py")
+
+
+def metrics_code_version() -> str:
+    h = hashlib.sha256(DETOXIFY_MODEL.encode("utf-8"))
+    for name in _CODE_FILES:
+        h.update((Path(__file__).parent / name).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def content_hash(task: str, inp: str) -> str:
+    return hashlib.sha256(f"{task}\0{inp}".encode("utf-8")).hexdigest()[:16]
+
+
+class InputFeatureStore:
+    """
+    in_* features of every dataset example, keyed by (id, content hash of task +
+    input). A record whose input differs from the dataset's (e.g. an old
+    raw_outputs.jsonl) misses and has its features computed as before.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.rows: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for rec in df.to_dict("records"):
+            columns = INPUT_FEATURES[rec["task"]][1]
+            self.rows[(rec["id"], rec["content_hash"])] = {c: float(rec[c]) for c in columns}
+
+    def get(self, record: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        return self.rows.get((record["id"], content_hash(record["task"], record["input"])))
+
+
+def _examples(data_path: Path) -> Iterable[Dict[str, Any]]:
+    with data_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                ex = json.loads(line)
+                if ex.get("task") in INPUT_FEATURES:
+                    yield ex
+
+
+def build_feature_table(data_path: Path) -> pd.DataFrame:
+    examples = list(_examples(data_path))
+    # Toxicity for all soften inputs as one batched pass, before the per-row loop
+    score_toxicity(ex["input"] for ex in examples if ex["task"] == "soften")
+    rows = []
+    for ex in examples:
+        features = INPUT_FEATURES[ex["task"]][0](ex["input"])
+        rows.append({"id": ex["id"], "task": ex["task"], "content_hash": content_hash(ex["task"], ex["input"]), **features})
+    return pd.DataFrame(rows)
+
+
+def load_feature_store(data_path: Path, store_dir: Optional[Path] = None) -> InputFeatureStore:
+    """
+    The feature store for this version of the dataset and metric code, from
+    <store_dir>/<dataset stem>.<version>.parquet (default store_dir: .features
+    next to the dataset). Built on first use; files of older versions are removed.
+    """
+    data_path = Path(data_path)
+    store_dir = Path(store_dir) if store_dir else data_path.parent / ".features"
+    version = hashlib.sha256(data_path.read_bytes() + metrics_code_version().encode("utf-8")).hexdigest()[:16]
+    path = store_dir / f"{data_path.stem}.{version}.parquet"
+
+    try:
+        return InputFeatureStore(pd.read_parquet(path))
+    except FileNotFoundError:
+        pass
+    except ImportError:
+        print("[warn] pyarrow not installed -> input features are recomputed every eval. pip install pyarrow")
+        return InputFeatureStore(build_feature_table(data_path))
+
+    df = build_feature_table(data_path)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    for stale in store_dir.glob(f"{data_path.stem}.*.parquet"):
+        if stale != path:
+            stale.unlink()
+    return InputFeatureStore(df)
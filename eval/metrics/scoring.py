@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .features import load_feature_store
+from .shared import bertscore_f1_batch
+from .simplify_metrics import simplify_metrics, simplify_composite
+from .soften_metrics import (
+    load_toxicity_memo,
+    save_toxicity_memo,
+    score_toxicity,
+    soften_metrics,
+    soften_composite,
+)
+
+
+def metric_rows(
+    records: Iterable[Dict[str, Any]],
+    *,
+    bertscore_min: float = 0.85,
+    toxicity_memo: Optional[Path] = None,
+    examples: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """
+    One metrics row per raw output record (run, id, input, output, error, ...).
+    BERTScore runs once over every scorable pair instead of once per row, and
+    toxicity once over the distinct soften texts not already in the memo file.
+    With `examples` (the dataset jsonl), in_* features come from its input
+    feature store instead of being recomputed for every run.
+    """
+    rows: List[Dict[str, Any]] = []
+    scorable = []
+    for rec in records:
+        task = rec["task"]
+        if task not in ("simplify", "soften"):
+            continue
+
+        inp = rec["input"]
+        out = rec.get("output", "") or ""
+        err = rec.get("error", "") or ""
+        row: Dict[str, Any] = {
+            "run": rec["run"],
+            "provider": rec["provider"],
+            "model": rec["model"],
+            "task": task,
+            "id": rec["id"],
+            "error": err,
+            "input_len": len(inp),
+            "output_len": len(out),
+        }
+        rows.append(row)
+
+        if not out.strip() or err:
+            row.update(
+                {
+                    "bertscore_f1": float("nan"),
+                    "passes_semantic": False,
+                    "composite": float("nan"),
+                }
+            )
+            continue
+        scorable.append((row, inp, out))
+
+    if toxicity_memo is not None:
+        load_toxicity_memo(toxicity_memo)
+    store = load_feature_store(examples) if examples is not None and Path(examples).exists() else None
+    score_toxicity(t for row, inp, out in scorable if row["task"] == "soften" for t in (inp, out))
+    if toxicity_memo is not None:
+        save_toxicity_memo(toxicity_memo)
+
+    f1s = bertscore_f1_batch([inp for _, inp, _ in scorable], [out for _, _, out in scorable])
+
+    for (row, inp, out), bs in zip(scorable, f1s):
+        row["bertscore_f1"] = bs
+        row["passes_semantic"] = bool(bs >= bertscore_min)
+        in_features = store.get({"id": row["id"], "task": row["task"], "input": inp}) if store is not None else None
+
+        if row["task"] == "simplify":
+            row.update(simplify_metrics(inp, out, in_features))
+            row["composite"] = simplify_composite(row) if row["passes_semantic"] else float("nan")
+        else:
+            row.update(soften_metrics(inp, out, in_features))
+            row["composite"] = soften_composite(row) if row["passes_semantic"] else float("nan")
+
+    return rows
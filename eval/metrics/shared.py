@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import os
 import re
-from typing import Dict, Any
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
 
 import numpy as np
-from bert_score import score as bert_score
+import torch
+from bert_score import BERTScorer
+from bert_score.utils import get_bert_embedding, greedy_cos_idf
+from torch.nn.utils.rnn import pad_sequence
 
 
 from transformers.utils import logging as hf_logging
@@ -12,6 +17,10 @@ hf_logging.set_verbosity_error()
 
 _WORD_RE = re.compile(r"[A-Za-z']+")
 
+# Pairs per forward pass / greedy-matching batch, and torch CPU threads (0 = torch default)
+BERTSCORE_BATCH_SIZE = int(os.getenv("BERTSCORE_BATCH_SIZE", "64"))
+BERTSCORE_THREADS = int(os.getenv("BERTSCORE_THREADS", "0"))
+
 
 def safe_len(s: str) -> int:
     return len(s or "")
@@ -30,11 +39,110 @@ def length_ratio(inp: str, out: str) -> float:
     return len(out) / li
 
 
+_Stats = Tuple[torch.Tensor, torch.Tensor]  # token embeddings, idf weights of one text
+
+
+def _pad(stats: List[_Stats], device) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    emb = [e.to(device) for e, _ in stats]
+    idf = [i.to(device) for _, i in stats]
+    lens = torch.tensor([e.size(0) for e in emb], dtype=torch.long)
+    mask = torch.arange(int(lens.max()), dtype=torch.long).expand(len(lens), -1) < lens.unsqueeze(1)
+    return pad_sequence(emb, batch_first=True, padding_value=2.0), mask.to(device), pad_sequence(idf, batch_first=True)
+
+
+class BatchedBertScore:
+    """
+    BERTScore F1 (same numbers as bert_score.score without idf/baseline) with the
+    model loaded once per process. Texts are encoded in length-sorted batches so
+    padding stays small, and input embeddings are kept: an eval scores the same
+    inputs against every run's outputs, so each input is encoded only once.
+    """
+
+    def __init__(self, lang: str = "en", batch_size: int = BERTSCORE_BATCH_SIZE, threads: int = BERTSCORE_THREADS):
+        self.lang = lang
+        self.batch_size = batch_size
+        self.threads = threads
+        self._scorer: Optional[BERTScorer] = None
+        self._idf_dict = None
+        self.input_cache: Dict[str, _Stats] = {}
+
+    @property
+    def scorer(self) -> BERTScorer:
+        if self._scorer is None:
+            if self.threads:
+                torch.set_num_threads(self.threads)
+            self._scorer = BERTScorer(lang=self.lang, batch_size=self.batch_size)
+            tokenizer = self._scorer._tokenizer
+            self._idf_dict = defaultdict(lambda: 1.0)
+            self._idf_dict[tokenizer.sep_token_id] = 0
+            self._idf_dict[tokenizer.cls_token_id] = 0
+        return self._scorer
+
+    def _embed(self, texts: List[str]) -> Dict[str, _Stats]:
+        scorer = self.scorer
+        stats: Dict[str, _Stats] = {}
+        texts = sorted(set(texts), key=lambda t: len(t.split(" ")), reverse=True)
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            embs, masks, idf = get_bert_embedding(
+                batch, scorer._model, scorer._tokenizer, self._idf_dict, device=scorer.device
+            )
+            embs, masks, idf = embs.cpu(), masks.cpu(), idf.cpu()
+            for i, text in enumerate(batch):
+                n = int(masks[i].sum().item())
+                stats[text] = (embs[i, :n], idf[i, :n])
+        return stats
+
+    def f1(self, inputs: List[str], outputs: List[str]) -> List[float]:
+        if not inputs:
+            return []
+        new_inputs = [t for t in set(inputs) if t not in self.input_cache]
+        # One encoding pass over the outputs and any inputs not seen before
+        encoded = self._embed(list(outputs) + new_inputs)
+        for t in new_inputs:
+            self.input_cache[t] = encoded[t]
+
+        refs = [self.input_cache[t] for t in inputs]
+        hyps = [encoded[t] for t in outputs]
+        # Group pairs of similar length into the same greedy-matching batch
+        order = sorted(range(len(inputs)), key=lambda i: (refs[i][0].size(0), hyps[i][0].size(0)))
+        device = next(self.scorer._model.parameters()).device
+        scores = [float("nan")] * len(inputs)
+        with torch.no_grad():
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                _, _, F1 = greedy_cos_idf(*_pad([refs[i] for i in idx], device), *_pad([hyps[i] for i in idx], device))
+                for i, f in zip(idx, F1.cpu().tolist()):
+                    scores[i] = float(f)
+        return scores
+
+
+_bertscorers: Dict[str, BatchedBertScore] = {}
+
+
+def get_bertscorer(lang: str = "en") -> BatchedBertScore:
+    if lang not in _bertscorers:
+        _bertscorers[lang] = BatchedBertScore(lang)
+    return _bertscorers[lang]
+
+
+def configure_bertscore(*, batch_size: Optional[int] = None, threads: Optional[int] = None, lang: str = "en") -> None:
+    """Set batch size / thread count; call before the first score (threads apply when the model loads)."""
+    scorer = get_bertscorer(lang)
+    if batch_size:
+        scorer.batch_size = batch_size
+    if threads:
+        scorer.threads = threads
+
+
+def bertscore_f1_batch(inputs: List[str], outputs: List[str], *, lang: str = "en") -> List[float]:
+    """bertscore_f1 for many (input, output) pairs at once; much faster than one call per pair."""
+    return get_bertscorer(lang).f1(inputs, outputs)
+
+
 def bertscore_f1(inp: str, out: str, *, lang: str = "en") -> float:
     """
     Reference-free semantic preservation proxy:
     compare output to input. Higher ~= better meaning preservation.
     """
-    # bert_score expects lists
-    P, R, F1 = bert_score([out], [inp], lang=lang, verbose=False)
-    return float(F1[0].item())
\ No newline at end of file
+    return bertscore_f1_batch([inp], [out], lang=lang)[0]
\ No newline at end of file
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, Optional
 import math
 
 import textstat
@@ -8,10 +8,21 @@ import textstat
 from .shared import word_stats, length_ratio
 
 
-def readability(inp: str, out: str) -> Dict[str, float]:
-    in_ease = float(textstat.flesch_reading_ease(inp))
+def simplify_input_features(inp: str) -> Dict[str, float]:
+    """Every in_* value of simplify_metrics; depends on the input only."""
+    ws_in = word_stats(inp)
+    return {
+        **{f"in_{k}": v for k, v in ws_in.items()},
+        "in_flesch_ease": float(textstat.flesch_reading_ease(inp)),
+        "in_fk_grade": float(textstat.flesch_kincaid_grade(inp)),
+    }
+
+
+def readability(inp: str, out: str, in_features: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    f = in_features or simplify_input_features(inp)
+    in_ease = f["in_flesch_ease"]
     out_ease = float(textstat.flesch_reading_ease(out))
-    in_grade = float(textstat.flesch_kincaid_grade(inp))
+    in_grade = f["in_fk_grade"]
     out_grade = float(textstat.flesch_kincaid_grade(out))
 
     return {
@@ -24,21 +35,23 @@ def readability(inp: str, out: str) -> Dict[str, float]:
     }
 
 
-def simplify_metrics(inp: str, out: str) -> Dict[str, float]:
-    ws_in = word_stats(inp)
+def simplify_metrics(inp: str, out: str, in_features: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """in_features: precomputed simplify_input_features(inp), e.g. from the input feature store."""
+    f = in_features or simplify_input_features(inp)
     ws_out = word_stats(out)
 
     lr = length_ratio(inp, out)
 
     m = {
-        **{f"in_{k}": v for k, v in ws_in.items()},
+        "in_num_words": f["in_num_words"],
+        "in_avg_word_len": f["in_avg_word_len"],
         **{f"out_{k}": v for k, v in ws_out.items()},
-        "avg_word_len_drop": (ws_in["avg_word_len"] - ws_out["avg_word_len"])
-        if (not math.isnan(ws_in["avg_word_len"]) and not math.isnan(ws_out["avg_word_len"]))
+        "avg_word_len_drop": (f["in_avg_word_len"] - ws_out["avg_word_len"])
+        if (not math.isnan(f["in_avg_word_len"]) and not math.isnan(ws_out["avg_word_len"]))
         else float("nan"),
         "length_ratio": lr,
     }
-    m.update(readability(inp, out))
+    m.update(readability(inp, out, f))
     return m
 
 
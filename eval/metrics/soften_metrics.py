@@ -1,7 +1,11 @@
 from __future__ import annotations
 
-from typing import Dict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import hashlib
+import json
 import math
+import os
 import re
 
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
@@ -44,44 +48,121 @@ def _count_words_from_list(text: str, words: list[str]) -> int:
     return sum(len(re.findall(rf"\b{re.escape(w)}\b", t)) for w in words)
 
 
+DETOXIFY_MODEL = "original"
+# Texts per Detoxify forward pass
+TOXICITY_BATCH_SIZE = int(os.getenv("TOXICITY_BATCH_SIZE", "32"))
+
+_UNLOADED = object()
+_detoxify = _UNLOADED
+# sha256(model + text) -> toxicity; see load_toxicity_memo / save_toxicity_memo
+_toxicity_memo: Dict[str, float] = {}
+
+
+def _detoxify_model():
+    """Detoxify model, loaded on first use and kept for the process; None if not installed."""
+    global _detoxify
+    if _detoxify is _UNLOADED:
+        try:
+            from detoxify import Detoxify  # type: ignore
+            _detoxify = Detoxify(DETOXIFY_MODEL)
+        except Exception:
+            _detoxify = None
+    return _detoxify
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(f"{DETOXIFY_MODEL}\0{text}".encode("utf-8")).hexdigest()
+
+
+def score_toxicity(texts: Iterable[str], batch_size: int = TOXICITY_BATCH_SIZE) -> None:
+    """
+    Score every text not yet in the memo, in length-sorted batches. Each
+    distinct text is scored once, however many runs share it.
+    """
+    pending = {}
+    for text in texts:
+        key = _text_key(text or "")
+        if key not in _toxicity_memo:
+            pending[key] = text or ""
+    if not pending:
+        return
+
+    model = _detoxify_model()
+    if model is None:
+        return
+
+    items = sorted(pending.items(), key=lambda kv: len(kv[1]))
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        # 'toxicity' key exists for Detoxify("original")
+        preds = model.predict([text for _, text in batch])["toxicity"]
+        for (key, _), tox in zip(batch, preds):
+            _toxicity_memo[key] = float(tox)
+
+
 def toxicity_score(text: str) -> float:
     """
     Optional: returns toxicity in [0,1]. If Detoxify isn't installed, returns NaN.
     """
+    score_toxicity([text], batch_size=1)
+    return _toxicity_memo.get(_text_key(text or ""), float("nan"))
+
+
+def load_toxicity_memo(path: Path) -> None:
+    """Add scores saved by an earlier eval; a missing or unreadable file is ignored."""
     try:
-        from detoxify import Detoxify  # type: ignore
-    except Exception:
-        return float("nan")
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    if data.get("model") == DETOXIFY_MODEL:
+        _toxicity_memo.update({k: float(v) for k, v in (data.get("scores") or {}).items()})
 
-    # instantiate lazily (Detoxify loads a model)
-    if not hasattr(toxicity_score, "_model"):
-        toxicity_score._model = Detoxify("original")  # type: ignore[attr-defined]
 
-    preds = toxicity_score._model.predict(text or "")  # type: ignore[attr-defined]
-    # 'toxicity' key exists for Detoxify("original")
-    return float(preds.get("toxicity", float("nan")))
+def save_toxicity_memo(path: Path) -> None:
+    if not _toxicity_memo:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"model": DETOXIFY_MODEL, "scores": _toxicity_memo}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def soften_input_features(inp: str) -> Dict[str, float]:
+    """Every input-side value of soften_metrics; depends on the input only."""
+    return {
+        "in_vader_compound": float(_analyzer.polarity_scores(inp or "")["compound"]),
+        "in_toxicity": float(toxicity_score(inp)),
+        "polite_markers_in": float(_count_markers(inp, _POLITE_MARKERS)),
+        "profanity_in": float(_count_words_from_list(inp, _PROFANITY)),
+    }
 
 
-def soften_metrics(inp: str, out: str) -> Dict[str, float]:
+def soften_metrics(inp: str, out: str, in_features: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """in_features: precomputed soften_input_features(inp), e.g. from the input feature store."""
     lr = length_ratio(inp, out)
 
-    in_sent = _analyzer.polarity_scores(inp or "")
+    f = in_features or soften_input_features(inp)
+    in_compound = f["in_vader_compound"]
     out_sent = _analyzer.polarity_scores(out or "")
 
-    in_tox = toxicity_score(inp)
+    in_tox = f["in_toxicity"]
+    if in_features is not None and math.isnan(in_tox):
+        # stored while Detoxify wasn't installed
+        in_tox = toxicity_score(inp)
     out_tox = toxicity_score(out)
 
-    polite_in = _count_markers(inp, _POLITE_MARKERS)
+    polite_in = f["polite_markers_in"]
     polite_out = _count_markers(out, _POLITE_MARKERS)
 
-    prof_in = _count_words_from_list(inp, _PROFANITY)
+    prof_in = f["profanity_in"]
     prof_out = _count_words_from_list(out, _PROFANITY)
 
     return {
         "length_ratio": lr,
-        "in_vader_compound": float(in_sent["compound"]),
+        "in_vader_compound": float(in_compound),
         "out_vader_compound": float(out_sent["compound"]),
-        "vader_compound_gain": float(out_sent["compound"] - in_sent["compound"]),  # higher = less negative
+        "vader_compound_gain": float(out_sent["compound"] - in_compound),  # higher = less negative
         "in_toxicity": float(in_tox),
         "out_toxicity": float(out_tox),
         "toxicity_drop": float(in_tox - out_tox) if (not math.isnan(in_tox) and not math.isnan(out_tox)) else float("nan"),
@@ -4,9 +4,10 @@ import argparse
 import json
 import os
 import re
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 import pandas as pd
 import yaml
@@ -14,13 +15,8 @@ from tqdm import tqdm
 
 from providers import get_provider
 from providers.base import GenParams
-from metrics import (
-    bertscore_f1,
-    simplify_metrics,
-    simplify_composite,
-    soften_metrics,
-    soften_composite,
-)
+from generation import GenerationCache, GenJob, GenResult, Limiter, generate_ordered
+from metrics import configure_bertscore, metric_rows
 
 
 def load_jsonl(path: Path) -> List[Dict[str, Any]]:
@@ -50,12 +46,41 @@ def now_stamp() -> str:
     return datetime.now().strftime("%Y-%m-%d_%H%M%S")
 
 
+def load_finished(*paths: Path) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Raw records of a previous (possibly crashed) run keyed by (run, id), from
+    raw_outputs.jsonl and its partial journal. Records with an error are left
+    out so they are generated again; a torn last line from a crash is ignored.
+    """
+    done: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for path in paths:
+        if not path.exists():
+            continue
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec, dict) and not rec.get("error") and "run" in rec and "id" in rec:
+                    done[(rec["run"], rec["id"])] = rec
+    return done
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--data", default="eval/data/examples.jsonl")
     ap.add_argument("--runs", default="eval/runs.yaml")
     ap.add_argument("--outdir", default="eval/results")
     ap.add_argument("--bertscore_min", type=float, default=0.85, help="Guardrail threshold for meaning preservation")
+    ap.add_argument("--bertscore_batch_size", type=int, default=None, help="Pairs per BERTScore batch (default: BERTSCORE_BATCH_SIZE or 64)")
+    ap.add_argument("--bertscore_threads", type=int, default=None, help="Torch CPU threads for BERTScore (default: BERTSCORE_THREADS or torch's choice)")
+    ap.add_argument("--toxicity_memo", default=None, help="Detoxify scores by text hash, reused across evals (default: <outdir>/toxicity_memo.json)")
+    ap.add_argument("--workers", type=int, default=None, help="Generations in flight (default: concurrency.workers in runs.yaml)")
+    ap.add_argument("--resume", default=None, help="Existing run dir to finish: keeps its (run, id) outputs and generates the rest")
+    ap.add_argument("--cache-dir", default="eval/.cache/generations", help="Content-addressed store of provider outputs")
+    ap.add_argument("--no-cache", action="store_true", help="Always call the provider")
+    ap.add_argument("--cache-all-temps", action="store_true", help="Also reuse cached outputs for temperature > 0 runs")
     args = ap.parse_args()
 
     data_path = Path(args.data)
@@ -72,17 +97,31 @@ def main():
     simplify_tpl = load_text(Path("eval/prompts/simplify.txt"))
     soften_tpl = load_text(Path("eval/prompts/soften.txt"))
 
-    run_dir = out_root / now_stamp()
+    run_dir = Path(args.resume) if args.resume else out_root / now_stamp()
     run_dir.mkdir(parents=True, exist_ok=True)
 
     raw_path = run_dir / "raw_outputs.jsonl"
     metrics_path = run_dir / "metrics.csv"
+    # Every finished generation is journaled here at once, in completion order,
+    # so a crash loses nothing still waiting behind a slower earlier request
+    partial_path = run_dir / "raw_outputs.partial.jsonl"
+
+    finished = load_finished(raw_path, partial_path) if args.resume else {}
+    if finished:
+        # raw_outputs.jsonl is rewritten in order below; keep the old records safe until then
+        tmp = partial_path.with_name(partial_path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for rec in finished.values():
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(tmp, partial_path)
+        print(f"Resuming {run_dir}: {len(finished)} outputs already done")
 
     # Provider instances (reuse across runs)
     providers: Dict[str, Any] = {}
 
     raw_f = raw_path.open("w", encoding="utf-8")
-    metric_rows: List[Dict[str, Any]] = []
+    partial_f = partial_path.open("a", encoding="utf-8")
+    partial_lock = threading.Lock()
 
     # Warn once if Detoxify isn't installed (soften toxicity)
     try:
@@ -90,6 +129,11 @@ def main():
     except Exception:
         print("[warn] detoxify not installed -> toxicity metrics will be NaN. (Optional) pip install detoxify torch")
 
+    # Every (run, example) generation, in output order; pairs finished by the
+    # resumed run carry their raw record instead of a job
+    jobs: List[GenJob] = []
+    job_info: List[Dict[str, Any]] = []
+    entries: List[Tuple[str, Any]] = []
     for run in runs:
         run_name = run["name"]
         provider_name = run["provider"]
@@ -99,87 +143,89 @@ def main():
         top_p = run.get("top_p", None)
         params = GenParams(temperature=temperature, max_tokens=max_tokens, top_p=top_p)
 
-        if provider_name not in providers:
-            providers[provider_name] = get_provider(provider_name)
-        provider = providers[provider_name]
-
-        for ex in tqdm(examples, desc=f"run={run_name}", unit="ex"):
-            ex_id = ex["id"]
+        for ex in examples:
             task = ex["task"]
-            inp = ex["input"]
-
             if task not in ("simplify", "soften"):
                 continue
 
-            tpl = simplify_tpl if task == "simplify" else soften_tpl
-            prompt = render_prompt(tpl, inp)
-
-            # Generate
-            try:
-                out = provider.generate(model=model, prompt=prompt, params=params)
-                out = strip_thinking(out)
-            except Exception as e:
-                out = ""
-                err = repr(e)
-            else:
-                err = ""
-
-            raw_record = {
-                "run": run_name,
-                "provider": provider_name,
-                "model": model,
-                "task": task,
-                "id": ex_id,
-                "input": inp,
-                "output": out,
-                "error": err,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "top_p": top_p,
-            }
-            raw_f.write(json.dumps(raw_record, ensure_ascii=False) + "\n")
-
-            # Metrics
-            row: Dict[str, Any] = {
-                "run": run_name,
-                "provider": provider_name,
-                "model": model,
-                "task": task,
-                "id": ex_id,
-                "error": err,
-                "input_len": len(inp),
-                "output_len": len(out),
-            }
-
-            if not out.strip() or err:
-                row.update(
-                    {
-                        "bertscore_f1": float("nan"),
-                        "passes_semantic": False,
-                        "composite": float("nan"),
-                    }
-                )
-                metric_rows.append(row)
+            if (run_name, ex["id"]) in finished:
+                entries.append(("done", finished[(run_name, ex["id"])]))
                 continue
 
-            bs = bertscore_f1(inp, out)
-            row["bertscore_f1"] = bs
-            row["passes_semantic"] = bool(bs >= args.bertscore_min)
-
-            if task == "simplify":
-                sm = simplify_metrics(inp, out)
-                row.update(sm)
-                row["composite"] = simplify_composite(row) if row["passes_semantic"] else float("nan")
-            else:
-                tm = soften_metrics(inp, out)
-                row.update(tm)
-                row["composite"] = soften_composite(row) if row["passes_semantic"] else float("nan")
+            tpl = simplify_tpl if task == "simplify" else soften_tpl
+            jobs.append(GenJob(run=run_name, provider=provider_name, model=model,
+                               prompt=render_prompt(tpl, ex["input"]), params=params))
+            job_info.append({"ex": ex, "temperature": temperature, "max_tokens": max_tokens, "top_p": top_p})
+            entries.append(("job", len(jobs) - 1))
+
+    def provider_for(name: str):
+        if name not in providers:
+            providers[name] = get_provider(name)
+        return providers[name]
+
+    def raw_record_for(job: GenJob, result: GenResult, info: Dict[str, Any]) -> Dict[str, Any]:
+        ex = info["ex"]
+        return {
+            "run": job.run,
+            "provider": job.provider,
+            "model": job.model,
+            "task": ex["task"],
+            "id": ex["id"],
+            "input": ex["input"],
+            "output": strip_thinking(result.output) if not result.error else "",
+            "error": result.error,
+            "temperature": info["temperature"],
+            "max_tokens": info["max_tokens"],
+            "top_p": info["top_p"],
+        }
+
+    def journal(index: int, job: GenJob, result: GenResult):
+        line = json.dumps(raw_record_for(job, result, job_info[index]), ensure_ascii=False) + "\n"
+        with partial_lock:
+            partial_f.write(line)
+            partial_f.flush()
+
+    cache = None if args.no_cache else GenerationCache(Path(args.cache_dir), all_temperatures=args.cache_all_temps)
+
+    concurrency = runs_cfg.get("concurrency") or {}
+    limiter = Limiter(concurrency)
+    generated = generate_ordered(
+        jobs,
+        provider_for,
+        limiter,
+        workers=args.workers or int(concurrency.get("workers", 8)),
+        max_retries=int(concurrency.get("max_retries", 6)),
+        backoff_s=float(concurrency.get("backoff_s", 2.0)),
+        cache=cache,
+        on_result=journal,
+    )
 
-            metric_rows.append(row)
+    # Results arrive in (run, example) order regardless of which request finished first
+    cached = 0
+    raw_records: List[Dict[str, Any]] = []
+    for kind, entry in tqdm(entries, desc="generate", unit="ex"):
+        if kind == "done":
+            raw_record = entry
+        else:
+            job, result = next(generated)
+            cached += result.cached
+            raw_record = raw_record_for(job, result, job_info[entry])
+
+        raw_f.write(json.dumps(raw_record, ensure_ascii=False) + "\n")
+        raw_f.flush()
+        raw_records.append(raw_record)
 
     raw_f.close()
-
-    df = pd.DataFrame(metric_rows)
+    partial_f.close()
+    # raw_outputs.jsonl is complete; the journal is only needed to recover a crash
+    partial_path.unlink()
+    if cache is not None:
+        print(f"Generation cache: {cached} of {len(jobs)} outputs reused from {cache.root}")
+
+    # Metrics as one batched stage over all outputs
+    toxicity_memo = Path(args.toxicity_memo) if args.toxicity_memo else out_root / "toxicity_memo.json"
+    configure_bertscore(batch_size=args.bertscore_batch_size, threads=args.bertscore_threads)
+    df = pd.DataFrame(metric_rows(raw_records, bertscore_min=args.bertscore_min, toxicity_memo=toxicity_memo, examples=data_path))
     df.to_csv(metrics_path, index=False)
 
     # Summary (per run/task)
@@ -0,0 +1,104 @@
+import math
+import re
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•‣▪]|\d+[.)])\s+")
+_NON_WORD_RE = re.compile(r"[^a-z0-9 ]+")
+
+
+def _pieces(text: str, max_chars: int) -> list[tuple[str, str]]:
+    """
+    Break text into (joiner, piece) units no longer than max_chars where possible:
+    paragraphs first, then lines (bullets), then sentences.
+    """
+    pieces = []
+    for paragraph in _PARAGRAPH_RE.split(text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(("\n\n", paragraph))
+            continue
+        joiner = "\n\n"
+        for line in paragraph.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) <= max_chars:
+                pieces.append((joiner, line))
+            else:
+                for i, sentence in enumerate(_SENTENCE_RE.split(line)):
+                    pieces.append((joiner if i == 0 else " ", sentence))
+            joiner = "\n"
+    return pieces
+
+
+def split_into_chunks(text: str, max_chars: int) -> list[str]:
+    """Pack paragraph / bullet / sentence units greedily into chunks of at most max_chars."""
+    chunks = []
+    current = ""
+    for joiner, piece in _pieces(text, max_chars):
+        if current and len(current) + len(joiner) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}{joiner}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_max_tokens(chunk: str, settings: dict, cap: int) -> int:
+    """Output budget for one chunk, scaled from its input length instead of the global max_tokens."""
+    chars_per_token = float(settings.get("chars_per_token", 4.0))
+    output_ratio = float(settings.get("output_ratio", 1.5))
+    extra = int(settings.get("extra_tokens", 128))  # room for actionable bullets / reasoning preamble
+    budget = math.ceil(len(chunk) / chars_per_token * output_ratio) + extra
+    return max(int(settings.get("min_tokens", 128)), min(cap, budget))
+
+
+def _bullet_key(line: str) -> str:
+    text = _BULLET_RE.sub("", line).lower()
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+def _split_trailing_bullets(output: str, bullet_prefix: str) -> tuple[str, list[str]]:
+    lines = output.rstrip().split("\n")
+    bullets = []
+    while lines:
+        line = lines[-1].strip()
+        if not line and bullets:
+            lines.pop()
+        elif line and (line.startswith(bullet_prefix) or _BULLET_RE.match(line)):
+            bullets.insert(0, line)
+            lines.pop()
+        else:
+            break
+    return "\n".join(lines).strip(), bullets
+
+
+def stitch_chunks(outputs: list[str], *, actionable: bool, bullet_prefix: str, max_bullets: int = 6) -> str:
+    """
+    Join rewritten chunks back together. With actionable, each chunk ends with
+    its own bullet list; those lists are merged into one, de-duplicated, at the end.
+    """
+    if not actionable:
+        return "\n\n".join(o.strip() for o in outputs if o.strip())
+
+    bodies = []
+    bullets = []
+    seen = set()
+    for output in outputs:
+        body, chunk_bullets = _split_trailing_bullets(output, bullet_prefix)
+        if body:
+            bodies.append(body)
+        for bullet in chunk_bullets:
+            key = _bullet_key(bullet)
+            if key and key not in seen:
+                seen.add(key)
+                bullets.append(bullet)
+
+    stitched = "\n\n".join(bodies)
+    if bullets:
+        stitched += "\n\n" + "\n".join(bullets[:max_bullets])
+    return stitched.strip()
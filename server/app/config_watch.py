@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+from app.model_cfg import model_config_store
+from app.prompt_cfg import prompt_store
+
+CONFIG_POLL_INTERVAL = float(os.getenv("CONFIG_POLL_INTERVAL", "2.0"))
+
+
+class ConfigWatcher:
+    """
+    Background poll that hot-reloads prompts.yaml and model_config.yaml.
+    Each store validates the new file and swaps its snapshot in one assignment,
+    so requests never see a half-loaded config.
+    """
+
+    def __init__(self, stores, interval: float = CONFIG_POLL_INTERVAL):
+        self.stores = stores
+        self.interval = interval
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for store in self.stores:
+                if store.reload_if_changed():
+                    print(f"Reloaded {type(store).__name__} (version {store.version})")
+
+    def start(self):
+        for store in self.stores:
+            store.snapshot()  # fail fast on startup if a file is missing or invalid
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+config_watcher = ConfigWatcher([prompt_store, model_config_store])
@@ -0,0 +1,12 @@
+"""Record timestamps are stored as naive UTC; these bring query inputs to the same form."""
+from datetime import datetime, timezone
+
+
+def naive_utc(value: datetime) -> datetime:
+    """An aware datetime converted to UTC, without tzinfo; a naive one is taken as UTC already."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def parse_utc(value: str) -> datetime:
+    """ISO 8601 date or datetime ("Z" and offsets accepted) as naive UTC. Raises ValueError."""
+    return naive_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
@@ -0,0 +1,302 @@
+"""
+Streaming export of feedback_records to CSV, JSONL or Parquet.
+
+Used by GET /api/feedback-records/export and as a CLI:
+
+    python -m app.export --format parquet --out exports/feedback.parquet --state exports/feedback.watermark
+
+Records are read in insertion order through a server-side cursor in batches of
+--batch-size and encoded batch by batch, so memory stays bounded by one batch.
+With --state, only records newer than the watermark saved by the previous run
+are exported, and the watermark is advanced once the file is complete.
+
+Incremental exports follow inserted_at, stamped by the record writer when a
+record is written (journal replays and batch writes included), not created_at:
+a record can land well after it was created. Records inserted in the last
+EXPORT_SETTLE_S seconds are left for the next run, so every record whose write
+finishes within that window of its stamp is exported exactly once.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from bson import ObjectId
+
+from app.dates import parse_utc
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+DEFAULT_BATCH_SIZE = 500
+# Seconds a record must have been inserted before an export includes it
+EXPORT_SETTLE_S = float(os.getenv("EXPORT_SETTLE_S", "120"))
+
+# Fixed export schema; every format writes these columns in this order
+EXPORT_COLUMNS = (
+    "id", "created_at", "user_email", "user_id", "submission_id", "methods",
+    "input_text", "output_text", "input_length", "output_length",
+)
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_row(document: dict) -> dict:
+    input_text = document.get("input_text") or ""
+    output_text = document.get("output_text") or ""
+    return {
+        "id": str(document["_id"]),
+        "created_at": document["created_at"],
+        # Not an export column; drives the watermark. Records from before it existed are backfilled from created_at
+        "inserted_at": document.get("inserted_at") or document["created_at"],
+        "user_email": document.get("user_email", "Guest"),
+        "user_id": str(document["user_id"]) if document.get("user_id") is not None else None,
+        "submission_id": document.get("submission_id"),
+        "methods": list(document.get("methods") or []),
+        "input_text": input_text,
+        "output_text": output_text,
+        # Older records were written without lengths
+        "input_length": document.get("input_length") or len(input_text),
+        "output_length": document.get("output_length") or len(output_text),
+    }
+
+
+def format_watermark(row: dict) -> str:
+    return f"{row['inserted_at'].isoformat()}|{row['id']}"
+
+
+def watermark_query(watermark: str) -> dict:
+    """
+    Records strictly after a watermark, in (inserted_at, _id) order.
+    Accepts "inserted_at|id" as written by format_watermark, or a bare ISO date.
+    """
+    inserted_at, _, record_id = watermark.partition("|")
+    inserted_at = parse_utc(inserted_at)
+    if not record_id:
+        return {"inserted_at": {"$gt": inserted_at}}
+    object_id = ObjectId(record_id)
+    return {"$or": [
+        {"inserted_at": {"$gt": inserted_at}},
+        {"inserted_at": inserted_at, "_id": {"$gt": object_id}},
+    ]}
+
+
+async def iter_batches(collection, query: dict, batch_size: int = DEFAULT_BATCH_SIZE, settle_s: float = EXPORT_SETTLE_S):
+    """
+    Export rows in insertion order, batch_size at a time, from one server-side
+    cursor. Records inserted less than settle_s seconds ago are left out.
+    """
+    settled = {"inserted_at": {"$lte": datetime.utcnow() - timedelta(seconds=settle_s)}}
+    query = {"$and": [query, settled]} if query else settled
+    cursor = collection.find(query).sort([("inserted_at", 1), ("_id", 1)]).batch_size(batch_size)
+    batch = []
+    async for document in cursor:
+        batch.append(export_row(document))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _encode_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in batches:
+        for row in batch:
+            writer.writerow([
+                row["created_at"].isoformat() if column == "created_at"
+                else ";".join(row["methods"]) if column == "methods"
+                else "" if row[column] is None
+                else row[column]
+                for column in EXPORT_COLUMNS
+            ])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _encode_jsonl(batches):
+    async for batch in batches:
+        lines = [
+            json.dumps({**{c: row[c] for c in EXPORT_COLUMNS}, "created_at": row["created_at"].isoformat()},
+                       ensure_ascii=False)
+            for row in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ParquetSink:
+    """Write-only file object that hands back what ParquetWriter has written so far."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("created_at", pa.timestamp("ms")),
+        ("user_email", pa.string()),
+        ("user_id", pa.string()),
+        ("submission_id", pa.string()),
+        ("methods", pa.list_(pa.string())),
+        ("input_text", pa.string()),
+        ("output_text", pa.string()),
+        ("input_length", pa.int32()),
+        ("output_length", pa.int32()),
+    ])
+
+
+async def _encode_parquet(batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ParquetSink()
+    # One row group per batch, streamed out as soon as it is written
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        async for batch in batches:
+            columns = {c: [row[c] for row in batch] for c in EXPORT_COLUMNS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def encode(fmt: str, batches):
+    """Async iterator of bytes for batches of export rows in the given format."""
+    if fmt == "csv":
+        return _encode_csv(batches)
+    if fmt == "jsonl":
+        return _encode_jsonl(batches)
+    if fmt == "parquet":
+        return _encode_parquet(batches)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+async def export_to_file(
+    collection, query: dict, fmt: str, out: Path, batch_size: int, settle_s: float = EXPORT_SETTLE_S,
+) -> tuple[int, Optional[str]]:
+    """Write an export file atomically. Returns (rows written, watermark of the last row)."""
+    state = {"rows": 0, "watermark": None}
+
+    async def tracked():
+        async for batch in iter_batches(collection, query, batch_size, settle_s):
+            state["rows"] += len(batch)
+            state["watermark"] = format_watermark(batch[-1])
+            yield batch
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("wb") as f:
+        async for chunk in encode(fmt, tracked()):
+            f.write(chunk)
+    os.replace(tmp, out)
+    return state["rows"], state["watermark"]
+
+
+async def _run(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    state_path = Path(args.state) if args.state else None
+    watermark = args.after
+    if watermark is None and state_path is not None and state_path.exists():
+        watermark = state_path.read_text(encoding="utf-8").strip() or None
+
+    conditions = []
+    if watermark:
+        conditions.append(watermark_query(watermark))
+    if args.user:
+        conditions.append({"user_email": args.user})
+    created = {}
+    if args.since:
+        created["$gte"] = parse_utc(args.since)
+    if args.until:
+        created["$lt"] = parse_utc(args.until)
+    if created:
+        conditions.append({"created_at": created})
+    query = {"$and": conditions} if conditions else {}
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    try:
+        collection = client[args.db].feedback_records
+        rows, last = await export_to_file(
+            collection, query, args.format, Path(args.out), args.batch_size, args.settle_s
+        )
+    finally:
+        client.close()
+
+    print(f"Exported {rows} records to {args.out}" + (f" (after {watermark})" if watermark else ""))
+    if state_path is not None and last is not None:
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        state_path.write_text(last + "\n", encoding="utf-8")
+        print(f"Watermark saved to {state_path}: {last}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export feedback_records to CSV, JSONL or Parquet")
+    ap.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl")
+    ap.add_argument("--out", required=True, help="Output file (written atomically)")
+    ap.add_argument("--state", help="Watermark file: export only records after it, then advance it")
+    ap.add_argument("--after", help="Explicit watermark ('inserted_at|id' or ISO date); overrides --state")
+    ap.add_argument("--user", help="Only records for this user_email")
+    ap.add_argument("--since", help="created_at lower bound (inclusive, ISO date)")
+    ap.add_argument("--until", help="created_at upper bound (exclusive, ISO date)")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ap.add_argument("--settle-s", type=float, default=EXPORT_SETTLE_S,
+                    help="Leave out records inserted less than this many seconds ago (default: EXPORT_SETTLE_S or 120)")
+    ap.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://mongo:27017"))
+    ap.add_argument("--db", default="feedback_db")
+    args = ap.parse_args()
+
+    if args.format == "parquet" and not parquet_available():
+        ap.error("Parquet export needs pyarrow (pip install pyarrow)")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
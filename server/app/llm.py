@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+from typing import Callable, Optional
+
+import httpx
+from groq import AsyncGroq
+
+from app.model_cfg import model_config_store
+from app.metrics import llm_request_seconds, llm_tokens_total, llm_errors_total
+
+
+class LLMClient:
+    """
+    Shared async chat-completions client.
+
+    One pooled httpx connection pool (with keep-alive) is reused by every
+    request, and a semaphore caps how many LLM calls are in flight at once.
+    Pool / timeout settings come from the `client` section of model_config.yaml.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._semaphore = None
+        self._timeout = None
+
+    def _settings(self) -> dict:
+        cfg = model_config_store.load()
+        return cfg.get("client") or {}
+
+    def get(self) -> AsyncGroq:
+        if self._client is None:
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise RuntimeError("GROQ_API_KEY not set. Please set it in your environment variables (`.env file`).")
+
+            settings = self._settings()
+            max_connections = int(settings.get("max_connections", 20))
+            self._timeout = float(settings.get("timeout_s", 30.0))
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=int(settings.get("max_keepalive_connections", max_connections)),
+                    keepalive_expiry=float(settings.get("keepalive_expiry_s", 30.0)),
+                ),
+                timeout=httpx.Timeout(self._timeout, connect=float(settings.get("connect_timeout_s", 5.0))),
+            )
+            self._client = AsyncGroq(
+                api_key=api_key,
+                base_url=os.getenv("GROQ_BASE_URL") or None,
+                http_client=http_client,
+                max_retries=int(settings.get("max_retries", 2)),
+            )
+            self._semaphore = asyncio.Semaphore(int(settings.get("max_concurrency", 8)))
+        return self._client
+
+    @property
+    def saturated(self) -> bool:
+        """True when every concurrency slot is taken, so a new call would have to queue."""
+        return self._semaphore is not None and self._semaphore.locked()
+
+    async def chat(
+        self,
+        *,
+        model: str,
+        messages: list[dict],
+        timeout: float | None = None,
+        on_start: Optional[Callable[[], None]] = None,
+        **params,
+    ):
+        """
+        Run one chat completion under the concurrency cap. on_start() is called
+        once a slot is acquired, i.e. when the provider call really begins.
+        """
+        client = self.get()
+        async with self._semaphore:
+            if on_start is not None:
+                on_start()
+            start = time.perf_counter()
+            try:
+                resp = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout if timeout is not None else self._timeout,
+                    **params,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                llm_errors_total.inc(model=model, error=type(e).__name__)
+                raise
+            llm_request_seconds.observe(time.perf_counter() - start, model=model, mode="chat")
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            llm_tokens_total.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+            llm_tokens_total.inc(usage.completion_tokens or 0, model=model, kind="completion")
+        return resp
+
+    async def stream(self, *, model: str, messages: list[dict], timeout: float | None = None, **params):
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+        The concurrency slot is held until the stream is exhausted.
+        """
+        client = self.get()
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout if timeout is not None else self._timeout,
+                    stream=True,
+                    **params,
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            except (asyncio.CancelledError, GeneratorExit):
+                raise
+            except Exception as e:
+                llm_errors_total.inc(model=model, error=type(e).__name__)
+                raise
+            llm_request_seconds.observe(time.perf_counter() - start, model=model, mode="stream")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._semaphore = None
+
+
+llm_client = LLMClient()
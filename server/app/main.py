@@ -1,23 +1,40 @@
 import os
-import re
-from fastapi import FastAPI, HTTPException
+import json
+import asyncio
+import base64
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 from dotenv import load_dotenv
-from groq import Groq
-from app.prompt_cfg import prompt_store, build_system_prompt, build_user_prompt
+from app.llm import llm_client
+from app.reasoning import ThinkStripper, strip_thinking
+from app.result_cache import result_cache, request_key
+from app.singleflight import interpret_flight
+from app.router import model_router, AUTO_MODEL
+from app.chunking import split_into_chunks, chunk_max_tokens, stitch_chunks
+from app.record_stats import record_stats
+from app.passwords import password_hasher
+from app.ratelimit import rate_limiter, client_key, interpret_cost, actual_interpret_cost, track_extra_cost
+from app import export as record_export
+from app.dates import parse_utc
+from app.metrics import registry, mongo_op_seconds, MetricsMiddleware
+from app.tracing import TracingMiddleware, span, mark, timings
+from app.prompt_cfg import prompt_store
+from app.config_watch import config_watcher
 from app.model_cfg import model_config_store
 from app.mongodb import (
     connect_db,
     disconnect_db,
     ensure_collections,
     feedback_records_collection,
+    record_writer,
     database
 )
 import time
 from bson import ObjectId
-from auth import router as auth_router
+from auth import router as auth_router, get_token_claims
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
@@ -26,22 +43,11 @@ API_KEY = os.getenv("GROQ_API_KEY")
 if not API_KEY:
     raise RuntimeError("GROQ_API_KEY not set")
 
-client = None
-
 async def get_database():
     return database
 
 __all__ = ["database", "get_database"]
 
-def get_client():
-    global client
-    if client is None:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise RuntimeError("GROQ_API_KEY not set. Please set it in your environment variables (`.env file`).")
-        client = Groq(api_key=api_key)
-    return client
-
 app = FastAPI(title="Written Feedback Interpretation API")
 app.add_middleware(
     CORSMiddleware,
@@ -55,18 +61,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 app.include_router(auth_router)
 
 
 
 @app.on_event("startup")
 async def startup():
+    config_watcher.start()
     await connect_db()
     await ensure_collections()
+    await record_writer.replay_journal()
+    record_writer.start()
 
 @app.on_event("shutdown")
 async def shutdown():
+    await config_watcher.stop()
+    await llm_client.aclose()
+    await record_writer.stop()
+    password_hasher.shutdown()
     await disconnect_db()
 
 
@@ -74,6 +90,15 @@ class TestItem(BaseModel):
     name: str
     description: Optional[str] = None
 
+class FeedbackBulkDelete(BaseModel):
+    ids: Optional[list[str]] = None
+    user: Optional[str] = None
+    method: Optional[str] = None
+    since: Optional[str] = None
+    until: Optional[str] = None
+    all: bool = False  # required to delete with neither ids nor a filter
+    dry_run: bool = False
+
 class FeedbackRecord(BaseModel):
     input_text: str
     methods: list[str]
@@ -85,10 +110,28 @@ class FeedbackRecord(BaseModel):
 def health():
     return {"ok": True}
 
+# Both read the metric / router dicts the handlers update; async so they run on
+# the event loop with them instead of in the threadpool
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/interpret/stats")
+async def interpret_stats():
+    return {
+        "coalescing": interpret_flight.stats(),
+        "models": model_router.stats(),
+        "rate_limits": rate_limiter.stats(),
+    }
+
 @app.get("/api/models")
 def get_models():
     cfg = model_config_store.load()
-    return {"models": cfg.get("available_models", [])}
+    models = list(cfg.get("available_models", []))
+    if (cfg.get("routing") or {}).get("enabled"):
+        models.append(AUTO_MODEL)
+    return {"models": models}
 
 # @app.get("/api/db-status")
 # async def db_status():
@@ -185,122 +228,542 @@ def get_models():
 #     except Exception as e:
 #         raise HTTPException(status_code=400, detail="Invalid item ID")
 
-@app.post("/api/interpret")
-async def interpret(req: dict):
-    text = req.get("text", "")
-    options = req.get("options", {})
-    user_info = req.get("user_info", {})  # Get user information
-    
-    # If user is logged in, fetch their submission_id from database
-    user_submission_id = None
-    if user_info.get("email") and user_info.get("email") != "Guest":
+async def resolve_user(claims: Optional[dict]) -> dict:
+    """
+    Attribute a request to the user in its bearer token; no token means Guest.
+    Tokens carry submission_id, so no database read is needed; tokens issued
+    before that claim existed fall back to a single lookup by email.
+    """
+    if not claims:
+        return {"email": "Guest", "id": None, "submission_id": None}
+
+    user = {"email": claims.get("email"), "id": claims.get("sub"), "submission_id": claims.get("submission_id")}
+    if "submission_id" not in claims and user["email"]:
         try:
             db = await get_database()
-            user_record = await db.users.find_one({"email": user_info["email"]})
+            with span("user_lookup"), mongo_op_seconds.time(operation="users.find_one"):
+                user_record = await db.users.find_one({"email": user["email"]}, {"submission_id": 1})
             if user_record:
-                user_submission_id = user_record.get("submission_id")
+                user["submission_id"] = user_record.get("submission_id")
         except Exception as e:
             print(f"Error fetching user submission_id: {e}")
-    
+    return user
+
+
+def prepare_generation(text: str, options: dict, requested_model: Optional[str], max_tokens: Optional[int] = None):
+    """Build the chat messages and generation params for one interpret call."""
+    prompt = prompt_store.compiled(options)
+
+    model_cfg = model_config_store.load()
+    generation = model_cfg.get("generation", {})
+    available = model_cfg.get("available_models", [])
+
+    if requested_model == AUTO_MODEL:
+        model_name = model_router.pick()
+    else:
+        model_name = requested_model or (available[0] if available else None)
+    if not model_name:
+        raise HTTPException(status_code=400, detail="No model specified and none configured")
+
+    messages = [
+        {"role": "system", "content": prompt.system},
+        {"role": "user", "content": prompt.user_prompt(text)},
+    ]
+    params = {
+        "temperature": generation.get("temperature", 0.2),
+        "top_p": generation.get("top_p", 1.0),
+        "max_tokens": max_tokens or generation.get("max_tokens", 512),
+        "stop": generation.get("stop_sequences") or None,
+    }
+    return model_name, messages, params
+
+
+def selected_methods(options: dict) -> list[str]:
+    methods = []
+    if options:
+        if options.get("simplify"):
+            methods.append("simplify")
+        if options.get("actionable"):
+            methods.append("actionable")
+        if options.get("soften"):
+            methods.append("soften")
+    return methods
+
+
+def build_record(text: str, options: dict, output: str, user: dict) -> dict:
+    return {
+        "input_text": text,
+        "methods": selected_methods(options),
+        "output_text": output,
+        "input_length": len(text),
+        "output_length": len(output),
+        "user_email": user["email"],
+        "user_id": user["id"],
+        "submission_id": user["submission_id"],
+        "created_at": datetime.utcnow()
+    }
+
+
+async def generate_output(
+    text: str,
+    options: dict,
+    requested_model: Optional[str],
+    use_cache: bool = True,
+    max_tokens: Optional[int] = None,
+):
+    """
+    Run (or reuse) one rewrite. Returns (output, cache_status, model), where
+    cache_status is "coalesced" when the result came from an identical call already in flight.
+
+    With model "auto" the router picks the model and may hedge to a second one,
+    so results are cached and coalesced under "auto" rather than a concrete model.
+    """
+    with span("prompt"):
+        model_name, messages, params = prepare_generation(text, options, requested_model, max_tokens)
+    auto = requested_model == AUTO_MODEL
+    key_model = AUTO_MODEL if auto else model_name
+
+    with span("cache"):
+        cache_key = result_cache.key_for(text, options, key_model, params, bypass=not use_cache)
+        output, cache_status = await result_cache.lookup(cache_key)
+    if output is not None:
+        return output, cache_status, key_model
+
+    async def call_llm():
+        with span("llm"):
+            resp, answered_by = await model_router.chat(model_name, messages, params, hedge=auto)
+
+        raw_output = resp.choices[0].message.content or ""
+        with span("think_strip"):
+            result = strip_thinking(raw_output)
+        with span("cache_store"):
+            await result_cache.store(cache_key, result)
+        return result, answered_by
+
+    (output, answered_by), shared = await interpret_flight.do(
+        request_key(text, options, key_model, params), call_llm
+    )
+    if shared:
+        cache_status = "coalesced"
+
+    return output, cache_status, answered_by
+
+
+async def generate_chunked(text: str, options: dict, requested_model: Optional[str], use_cache: bool = True):
+    """
+    Opt-in path for long feedback: split at paragraph / bullet boundaries, rewrite
+    the chunks concurrently with per-chunk max_tokens, then stitch them back together.
+    Short inputs fall through to generate_output().
+    """
+    model_cfg = model_config_store.load()
+    settings = model_cfg.get("chunking") or {}
+    if len(text) < int(settings.get("min_chars", 1200)):
+        return await generate_output(text, options, requested_model, use_cache)
+
+    chunks = split_into_chunks(text, int(settings.get("max_chunk_chars", 800)))
+    if len(chunks) < 2:
+        return await generate_output(text, options, requested_model, use_cache)
+
+    cap = int(settings.get("max_tokens_cap") or (model_cfg.get("generation") or {}).get("max_tokens", 512))
+    results = await asyncio.gather(*(
+        generate_output(chunk, options, requested_model, use_cache, max_tokens=chunk_max_tokens(chunk, settings, cap))
+        for chunk in chunks
+    ))
+
+    fmt = prompt_store.load().get("format") or {}
+    output = stitch_chunks(
+        [r[0] for r in results],
+        actionable=bool(options and options.get("actionable")),
+        bullet_prefix=(fmt.get("bullet_prefix") or "• ").strip(),
+        max_bullets=int(settings.get("max_bullets", 6)),
+    )
+    models = {r[2] for r in results}
+    return output, "chunked", models.pop() if len(models) == 1 else AUTO_MODEL
+
+
+@app.post("/api/interpret")
+async def interpret(req: dict, request: Request, claims: Optional[dict] = Depends(get_token_claims)):
+    text = req.get("text", "")
+    options = req.get("options", {})
+
+    user = await resolve_user(claims)
+
     if not text.strip():
         raise HTTPException(status_code=400, detail="Input text is empty")
 
+    # Reserve the estimated token cost up front, settle it once the output is known
+    limit_key = client_key(request, claims)
+    estimate = interpret_cost(text)
+    reserved = (await rate_limiter.enforce("interpret", limit_key, route="/api/interpret", cost=estimate)).charged
+
     try:
-        prompt_cfg = prompt_store.load()
-        system_prompt = build_system_prompt(prompt_cfg)
-        user_prompt = build_user_prompt(text, options, prompt_cfg)
-
-        model_cfg = model_config_store.load()
-        generation = model_cfg.get("generation", {})
-        available = model_cfg.get("available_models", [])
-
-        model_name = req.get("model") or (available[0] if available else None)
-        if not model_name:
-            raise HTTPException(status_code=400, detail="No model specified and none configured")
-
-        temperature = generation.get("temperature", 0.2)
-        top_p = generation.get("top_p", 1.0)
-        max_tokens = generation.get("max_tokens", 512)
-        stop = generation.get("stop_sequences") or None
-
-        resp = get_client().chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=temperature,
-            top_p=top_p,
-            max_tokens=max_tokens,
-            stop=stop,
+        # Pass "cache": false in the request body to force a fresh generation
+        # Pass "chunked": true to split long inputs and rewrite the pieces in parallel
+        generate = generate_chunked if req.get("chunked") else generate_output
+        with track_extra_cost() as extra:
+            try:
+                output, cache_status, model_used = await generate(
+                    text, options, req.get("model"), use_cache=req.get("cache") is not False
+                )
+            except Exception:
+                await rate_limiter.adjust("interpret", limit_key, extra[0] - reserved)
+                raise
+        await rate_limiter.adjust(
+            "interpret", limit_key, actual_interpret_cost(text, output, cache_status) + extra[0] - reserved
         )
 
-        raw_output = resp.choices[0].message.content or ""
-        output = re.sub(r"<think>[\s\S]*?</think>", "", raw_output).strip()
-        
-        # Calculate lengths
-        input_length = len(text)
-        output_length = len(output)
-        
-        methods = []
-        if options:
-            if options.get("simplify"):
-                methods.append("simplify")
-            if options.get("actionable"):
-                methods.append("actionable")
-            if options.get("soften"):
-                methods.append("soften")
-            
-        record = {
-            "input_text": text,
-            "methods": methods,
-            "output_text": output,
-            "input_length": input_length,
-            "output_length": output_length,
-            "user_email": user_info.get("email", "Guest"),
-            "user_id": user_info.get("id", None),
-            "submission_id": user_submission_id,
-            "created_at": datetime.utcnow()
-        }
+        record = build_record(text, options, output, user)
+        with span("record"):
+            await record_writer.enqueue(record)
         
-        await feedback_records_collection.insert_one(record)
-        
-        return {"output": output}
+        return {"output": output, "cache": cache_status, "model": model_used}
 
     except HTTPException:
         raise
     except Exception as e:
         print("interpret() error:", repr(e))
         raise HTTPException(status_code=500, detail="LLM request failed")
+
+
+@app.post("/api/interpret/batch")
+async def interpret_batch(req: dict, request: Request, claims: Optional[dict] = Depends(get_token_claims)):
+    """
+    Rewrite many feedback items in one call.
+    Body: {"items": [{"text", "options", "model"}, ...]}; records are attributed via the bearer token.
+    Items run concurrently (bounded by batch.concurrency in model_config.yaml);
+    each result carries either "output" or "error", so one failure does not sink the batch.
+    All successful records are handed to the record writer together.
+    """
+    items = req.get("items") or []
+
+    batch_cfg = model_config_store.load().get("batch") or {}
+    max_items = int(batch_cfg.get("max_items", 100))
+    if not items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    if len(items) > max_items:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {max_items})")
+
+    user = await resolve_user(claims)
+    semaphore = asyncio.Semaphore(int(batch_cfg.get("concurrency", 4)))
+
+    limit_key = client_key(request, claims)
+    texts = [item.get("text", "") if isinstance(item, dict) else "" for item in items]
+    estimate = sum(interpret_cost(text) for text in texts if text.strip())
+    reserved = (await rate_limiter.enforce("interpret", limit_key, route="/api/interpret/batch", cost=estimate)).charged
+
+    async def run_item(index: int, item: dict) -> dict:
+        text = item.get("text", "") if isinstance(item, dict) else ""
+        options = item.get("options", {}) if isinstance(item, dict) else {}
+        if not text.strip():
+            return {"index": index, "error": "Input text is empty"}
+        try:
+            async with semaphore:
+                generate = generate_chunked if item.get("chunked", req.get("chunked")) else generate_output
+                output, cache_status, model_used = await generate(
+                    text, options, item.get("model") or req.get("model"), use_cache=req.get("cache") is not False
+                )
+        except HTTPException as e:
+            return {"index": index, "error": e.detail}
+        except Exception as e:
+            print(f"interpret_batch() item {index} error:", repr(e))
+            return {"index": index, "error": "LLM request failed"}
+        return {
+            "index": index,
+            "output": output,
+            "cache": cache_status,
+            "model": model_used,
+            "_record": build_record(text, options, output, user),
+            "_cost": actual_interpret_cost(text, output, cache_status),
+        }
+
+    with track_extra_cost() as extra:
+        results = await asyncio.gather(*(run_item(i, item) for i, item in enumerate(items)))
+    actual = sum(r.pop("_cost", 0) for r in results) + extra[0]
+    await rate_limiter.adjust("interpret", limit_key, actual - reserved)
+
+    records = [r.pop("_record") for r in results if "_record" in r]
+    if records:
+        with span("record"):
+            await record_writer.enqueue_many(records)
+
+    return {
+        "results": results,
+        "succeeded": len(records),
+        "failed": len(results) - len(records),
+    }
+
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/interpret/stream")
+async def interpret_stream(req: dict, request: Request, claims: Optional[dict] = Depends(get_token_claims)):
+    """
+    Server-Sent Events variant of /api/interpret.
+    Emits {"delta": ...} events as visible tokens arrive (reasoning blocks are
+    suppressed), then a final {"done": true, "output": ...} once the record is saved.
+    Identical requests already in flight (streamed or not) are coalesced: the
+    follower waits for that call and receives its output as a single delta.
+    For sampled requests the done event carries the stage timings ("timing"),
+    since the Server-Timing header is sent before any of them finish.
+    """
+    text = req.get("text", "")
+    options = req.get("options", {})
+
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Input text is empty")
+
+    limit_key = client_key(request, claims)
+    estimate = interpret_cost(text)
+    reserved = (await rate_limiter.enforce("interpret", limit_key, route="/api/interpret/stream", cost=estimate)).charged
+
+    user = await resolve_user(claims)
+    with span("prompt"):
+        model_name, messages, params = prepare_generation(text, options, req.get("model"))
+    key_model = AUTO_MODEL if req.get("model") == AUTO_MODEL else model_name
+
+    async def produce(cache_key: Optional[str], deltas: asyncio.Queue):
+        """The leader's LLM call; runs as its own task so a disconnect does not end it for followers."""
+        stripper = ThinkStripper()
+        parts = []
+        try:
+            async for delta in llm_client.stream(model=model_name, messages=messages, **params):
+                visible = stripper.feed(delta)
+                if visible:
+                    parts.append(visible)
+                    deltas.put_nowait(visible)
+            tail = stripper.flush()
+            if tail:
+                parts.append(tail)
+                deltas.put_nowait(tail)
+        finally:
+            deltas.put_nowait(None)
+        output = "".join(parts).strip()
+        await result_cache.store(cache_key, output)
+        return output, model_name
+
+    async def events():
+        with span("cache"):
+            cache_key = result_cache.key_for(text, options, model_name, params, bypass=req.get("cache") is False)
+            cached, cache_status = await result_cache.lookup(cache_key)
+        try:
+            if cached is not None:
+                output = cached
+                yield sse_event({"delta": cached})
+            else:
+                deltas = asyncio.Queue()
+                flight, shared = interpret_flight.join(
+                    request_key(text, options, key_model, params), lambda: produce(cache_key, deltas)
+                )
+                started = time.perf_counter()
+                with span("llm"):
+                    if shared:
+                        cache_status = "coalesced"
+                        output, _ = await asyncio.shield(flight)
+                        mark("llm_first_token", started)
+                        yield sse_event({"delta": output})
+                    else:
+                        while (delta := await deltas.get()) is not None:
+                            if started is not None:
+                                mark("llm_first_token", started)
+                                started = None
+                            yield sse_event({"delta": delta})
+                        output, _ = await asyncio.shield(flight)
+        except Exception as e:
+            print("interpret_stream() error:", repr(e))
+            await rate_limiter.adjust("interpret", limit_key, -reserved)
+            yield sse_event({"error": "LLM request failed"})
+            return
+
+        await rate_limiter.adjust("interpret", limit_key, actual_interpret_cost(text, output, cache_status) - reserved)
+        try:
+            record = build_record(text, options, output, user)
+            with span("record"):
+                await record_writer.enqueue(record)
+        except Exception as e:
+            print("interpret_stream() persist error:", repr(e))
+        done = {"done": True, "output": output, "cache": cache_status}
+        timing = timings()
+        if timing is not None:
+            done["timing"] = timing
+        yield sse_event(done)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
     
 
+RECORD_PAGE_DEFAULT = 50
+RECORD_PAGE_MAX = 500
+# List views can skip the full texts
+SUMMARY_PROJECTION = {"input_text": 0, "output_text": 0}
+
+
+def serialize_record(document: dict) -> dict:
+    record = {
+        "id": str(document["_id"]),
+        "methods": document.get("methods", []),
+        "input_length": document.get("input_length", 0),
+        "output_length": document.get("output_length", 0),
+        "user_email": document.get("user_email", "Guest"),
+        "user_id": document.get("user_id"),
+        "submission_id": document.get("submission_id"),
+        "created_at": document["created_at"].isoformat()
+    }
+    if "input_text" in document:
+        record["input_text"] = document["input_text"]
+    if "output_text" in document:
+        record["output_text"] = document["output_text"]
+    return record
+
+
+def parse_datetime(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return parse_utc(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date: {value}")
+
+
+def records_filter(
+    user: Optional[str] = None,
+    method: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> dict:
+    """Mongo filter for feedback records by user email, method and created_at range (since inclusive)."""
+    query = {}
+    if user:
+        query["user_email"] = user
+    if method:
+        query["methods"] = method
+    created = {}
+    if since:
+        created["$gte"] = parse_datetime(since, "since")
+    if until:
+        created["$lt"] = parse_datetime(until, "until")
+    if created:
+        query["created_at"] = created
+    return query
+
+
+def encode_cursor(document: dict) -> str:
+    raw = json.dumps([document["created_at"].isoformat(), str(document["_id"])])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Keyset condition for records strictly after the cursor in (created_at, _id) descending order."""
+    try:
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        created_at = datetime.fromisoformat(created_at)
+        object_id = ObjectId(record_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": object_id}},
+    ]}
+
+
 @app.get("/api/feedback-records")
-async def get_feedback_records():
-    """Get all feedback records from MongoDB"""
-    cursor = feedback_records_collection.find({}).sort("created_at", -1)
-    records = []
-    
-    async for document in cursor:
-        records.append({
-            "id": str(document["_id"]),
-            "input_text": document["input_text"],
-            "methods": document["methods"],
-            "output_text": document["output_text"],
-            "input_length": document.get("input_length", 0),
-            "output_length": document.get("output_length", 0),
-            "user_email": document.get("user_email", "Guest"),
-            "user_id": document.get("user_id"),
-            "submission_id": document.get("submission_id"),
-            "created_at": document["created_at"].isoformat()
-        })
-    
-    return records
+async def get_feedback_records(
+    limit: int = Query(RECORD_PAGE_DEFAULT, ge=1, le=RECORD_PAGE_MAX),
+    cursor: Optional[str] = None,
+    user: Optional[str] = None,
+    method: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: str = Query("full", pattern="^(full|summary)$"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    Feedback records, newest first, paginated by keyset on (created_at, _id).
+    Pass the returned next_cursor back as `cursor` for the next page.
+    fields=summary omits input_text/output_text; format=ndjson streams every
+    matching record (ignoring limit) one JSON object per line.
+    """
+    query = records_filter(user, method, since, until)
+    if cursor:
+        query = {"$and": [query, decode_cursor(cursor)]} if query else decode_cursor(cursor)
+    projection = SUMMARY_PROJECTION if fields == "summary" else None
+    sort = [("created_at", -1), ("_id", -1)]
+
+    if format == "ndjson":
+        async def lines():
+            db_cursor = feedback_records_collection.find(query, projection).sort(sort).batch_size(RECORD_PAGE_MAX)
+            async for document in db_cursor:
+                yield json.dumps(serialize_record(document), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    # Fetch one extra document to know whether another page exists
+    with mongo_op_seconds.time(operation="feedback_records.find"):
+        documents = await feedback_records_collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+
+    return {
+        "records": [serialize_record(d) for d in documents],
+        "next_cursor": encode_cursor(documents[-1]) if has_more else None,
+    }
+
+@app.get("/api/feedback-records/stats")
+async def feedback_record_stats(
+    user: Optional[str] = None,
+    method: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Aggregate usage stats (method combinations, length distributions, output/input
+    ratio, per-user and per-day volumes) over the matching records. Results are
+    cached for RECORD_STATS_TTL seconds per filter.
+    """
+    query = records_filter(user, method, since, until)
+    return await record_stats.get((user, method, since, until), query)
+
+@app.get("/api/feedback-records/export")
+async def export_feedback_records(
+    format: str = Query("jsonl", pattern="^(csv|jsonl|parquet)$"),
+    after: Optional[str] = None,
+    user: Optional[str] = None,
+    method: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    batch_size: int = Query(record_export.DEFAULT_BATCH_SIZE, ge=1, le=5000),
+):
+    """
+    Stream matching records, in insertion order, as CSV, JSONL or Parquet with a fixed
+    schema. `after` is a watermark ("inserted_at|id" of the last exported record,
+    or an ISO date) for incremental exports. Records inserted in the last
+    EXPORT_SETTLE_S seconds are left for the next export (see app.export).
+    """
+    if format == "parquet" and not record_export.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow installed on the server")
+    query = records_filter(user, method, since, until)
+    if after:
+        try:
+            condition = record_export.watermark_query(after)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid watermark")
+        query = {"$and": [query, condition]} if query else condition
+
+    batches = record_export.iter_batches(feedback_records_collection, query, batch_size)
+    return StreamingResponse(
+        record_export.encode(format, batches),
+        media_type=record_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="feedback_records.{format}"'},
+    )
 
 @app.delete("/api/feedback-records/{record_id}")
 async def delete_feedback_record(record_id: str):
     """Delete a specific feedback record"""
     try:
-        from bson import ObjectId
         object_id = ObjectId(record_id)
     except:
         raise HTTPException(
@@ -317,3 +780,34 @@ async def delete_feedback_record(record_id: str):
         )
     
     return {"message": f"Feedback record {record_id} deleted successfully"}
+
+
+@app.post("/api/feedback-records/bulk-delete")
+async def bulk_delete_feedback_records(req: FeedbackBulkDelete):
+    """
+    Delete feedback records by id list and/or filter (user, method, since, until)
+    in a single delete_many. With dry_run, only count what would be deleted.
+    """
+    query = records_filter(req.user, req.method, req.since, req.until)
+    if req.ids is not None:
+        try:
+            query["_id"] = {"$in": [ObjectId(record_id) for record_id in req.ids]}
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid record ID format"
+            )
+    if not query and not req.all:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass ids, a filter, or all=true"
+        )
+
+    if req.dry_run:
+        with mongo_op_seconds.time(operation="feedback_records.count_documents"):
+            count = await feedback_records_collection.count_documents(query)
+        return {"dry_run": True, "matched_count": count}
+
+    with mongo_op_seconds.time(operation="feedback_records.delete_many"):
+        result = await feedback_records_collection.delete_many(query)
+    return {"dry_run": False, "deleted_count": result.deleted_count}
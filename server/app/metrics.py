@@ -0,0 +1,176 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, shared by HTTP, LLM and Mongo histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """
+    Monotonic counter. Updates are plain dict writes with no lock: they, and
+    render() (the /metrics handler is async), only run on the event loop
+    thread, so they never interleave.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in self._values.items()]
+
+
+class Histogram:
+    """Histogram with fixed buckets; observe() is one bisect and two additions."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # key -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time; returns {label tuple: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple, callback):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in self.callback().items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, labelnames: tuple, callback) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")
+)
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency (until the last body byte)", ("route", "method")
+)
+llm_request_seconds = registry.histogram("llm_request_duration_seconds", "LLM call latency", ("model", "mode"))
+llm_tokens_total = registry.counter("llm_tokens_total", "Tokens reported by the LLM provider", ("model", "kind"))
+llm_errors_total = registry.counter("llm_errors_total", "Failed LLM calls", ("model", "error"))
+llm_hedges_total = registry.counter("llm_hedges_total", "Duplicate LLM calls sent by hedging", ("model",))
+llm_hedge_tokens_total = registry.counter(
+    "llm_hedge_tokens_total", "Estimated tokens spent by hedged calls that were cancelled", ("model",)
+)
+mongo_op_seconds = registry.histogram("mongo_operation_duration_seconds", "Mongo operation latency", ("operation",))
+rate_limit_rejections_total = registry.counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ("route",)
+)
+interpret_cache_total = registry.counter(
+    "interpret_cache_lookups_total", "Result cache lookups by outcome (memory, mongo, miss, bypass)", ("status",)
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, including streamed bodies."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_request_seconds.observe(time.perf_counter() - start, route=path, method=method)
+            http_requests_total.inc(route=path, method=method, status=status["code"])
@@ -1,28 +1,79 @@
+import hashlib
 import os
 from pathlib import Path
+from typing import NamedTuple, Optional
 import yaml
 
 DEFAULT_MODEL_FILE = Path(__file__).parent / "model_config.yaml"
 
 
+def model_config_path() -> Path:
+    return Path(os.getenv("MODEL_CONFIG_FILE", str(DEFAULT_MODEL_FILE)))
+
+
+class ModelConfigSnapshot(NamedTuple):
+    data: dict
+    mtime: float
+    version: str
+
+
+def validate_model_config(data: dict):
+    if not isinstance(data, dict):
+        raise ValueError("model config must be a mapping")
+    if not isinstance(data.get("available_models", []), list):
+        raise ValueError("available_models must be a list")
+    for section in ("generation", "client", "cache", "batch", "routing", "chunking", "rate_limits"):
+        if not isinstance(data.get(section) or {}, dict):
+            raise ValueError(f"{section} must be a mapping")
+
+
 class ModelConfigStore:
-    def __init__(self):
-        self._cache = None
-        self._cache_mtime = None
+    """
+    Holds a validated snapshot of model_config.yaml.
+    Like PromptStore, reloads happen off the request path via reload_if_changed().
+    """
 
-    def load(self):
-        path = Path(os.getenv("MODEL_CONFIG_FILE", str(DEFAULT_MODEL_FILE)))
+    def __init__(self):
+        self._rejected_mtime = None
+        self._snapshot: Optional[ModelConfigSnapshot] = None
 
+    def _read(self, path: Path) -> ModelConfigSnapshot:
         if not path.exists():
             raise RuntimeError(f"Model config file not found: {path}")
 
         mtime = path.stat().st_mtime
-        if self._cache is None or self._cache_mtime != mtime:
-            with path.open("r", encoding="utf-8") as f:
-                self._cache = yaml.safe_load(f) or {}
-            self._cache_mtime = mtime
+        raw = path.read_bytes()
+        data = yaml.safe_load(raw) or {}
+        validate_model_config(data)
+        return ModelConfigSnapshot(data, mtime, hashlib.sha256(raw).hexdigest()[:16])
+
+    def snapshot(self) -> ModelConfigSnapshot:
+        if self._snapshot is None:
+            self._snapshot = self._read(model_config_path())
+        return self._snapshot
 
-        return self._cache
+    def reload_if_changed(self) -> bool:
+        path = model_config_path()
+        current = self._snapshot
+        mtime = None
+        try:
+            mtime = path.stat().st_mtime
+            if (current is not None and mtime == current.mtime) or mtime == self._rejected_mtime:
+                return False
+            snapshot = self._read(path)
+        except Exception as e:
+            self._rejected_mtime = mtime
+            print(f"Model config reload rejected, keeping previous config: {e}")
+            return False
+        self._snapshot = snapshot
+        return True
+
+    @property
+    def version(self) -> str:
+        return self.snapshot().version
+
+    def load(self):
+        return self.snapshot().data
 
 
 model_config_store = ModelConfigStore()
@@ -1,6 +1,14 @@
 import os
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from bson import json_util
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import CollectionInvalid
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import CollectionInvalid, BulkWriteError, OperationFailure
+from app.metrics import mongo_op_seconds
+
+DUPLICATE_KEY = 11000
 
 # MongoDB connection
 MONGO_URL = os.getenv("MONGO_URL","mongodb://mongo:27017")
@@ -12,6 +20,37 @@ database = client.feedback_db
 # test2_collection = database.test2
 
 feedback_records_collection = database.feedback_records
+interpret_cache_collection = database.interpret_cache
+rate_limits_collection = database.rate_limits
+
+# Indexes declared per collection; ensure_indexes() reconciles the live ones against these
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True,
+                   partialFilterExpression={"email": {"$type": "string"}}),
+        IndexModel([("submission_id", ASCENDING)], name="submission_id_unique", unique=True,
+                   partialFilterExpression={"submission_id": {"$type": "string"}}),
+    ],
+    "feedback_records": [
+        # _id is the keyset tie-breaker for paginated listings
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at"),
+        IndexModel([("user_email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_email_created_at"),
+        # Incremental exports read in insertion order (app.export)
+        IndexModel([("inserted_at", ASCENDING), ("_id", ASCENDING)], name="inserted_at"),
+    ],
+    "interpret_cache": [
+        # Mongo removes cached results once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "rate_limits": [
+        # Buckets are full again by expires_at, so idle ones can simply be removed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Options compared when deciding whether a live index matches its declaration
+_INDEX_OPTIONS = ("unique", "partialFilterExpression", "expireAfterSeconds")
 
 
 async def connect_db():
@@ -43,3 +82,286 @@ async def ensure_collections():
 
     if "feedback_records" not in existing:  # Add this block
         await database.create_collection("feedback_records")
+
+    if "interpret_cache" not in existing:
+        await database.create_collection("interpret_cache")
+
+    if "users" not in existing:
+        await database.create_collection("users")
+
+    if "rate_limits" not in existing:
+        await database.create_collection("rate_limits")
+
+    await ensure_indexes()
+    await backfill_inserted_at()
+
+
+async def backfill_inserted_at():
+    """Give records written before inserted_at existed their created_at, so exports still see them."""
+    try:
+        result = await feedback_records_collection.update_many(
+            {"inserted_at": {"$exists": False}}, [{"$set": {"inserted_at": "$created_at"}}]
+        )
+        if result.modified_count:
+            print(f"Backfilled inserted_at on {result.modified_count} feedback records")
+    except Exception as e:
+        print(f"Could not backfill inserted_at: {e}")
+
+
+def _same_index(live: dict, declared: dict) -> bool:
+    if list(live["key"]) != list(declared["key"].items()):
+        return False
+    return all(live.get(opt) == declared.get(opt) for opt in _INDEX_OPTIONS)
+
+
+async def _find_duplicate(collection, declared: dict):
+    """A key value that more than one document shares, or None; what would block a unique index."""
+    fields = list(declared["key"])
+    pipeline = [
+        {"$match": declared.get("partialFilterExpression") or {}},
+        {"$group": {"_id": {f: f"${f}" for f in fields}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+        {"$limit": 1},
+    ]
+    async for doc in collection.aggregate(pipeline):
+        return doc["_id"]
+    return None
+
+
+async def ensure_indexes():
+    """
+    Create the indexes in INDEXES, replacing any live index that has the same
+    name or key but different options. Undeclared indexes are left alone.
+
+    The replacement is built before the old index is dropped where Mongo allows
+    both to exist (named <name>_next if the declared name is taken). Where it
+    does not, the old index is dropped first and recreated if the build fails,
+    so a failed build does not leave the collection without it. Signup
+    relies on the unique indexes, so failing to build one stops startup;
+    other index failures are logged.
+    """
+    for collection_name, models in INDEXES.items():
+        collection = database[collection_name]
+        live = await collection.index_information()
+        for model in models:
+            declared = model.document
+            name = declared["name"]
+            key = list(declared["key"].items())
+            if any(_same_index(info, declared) for info in live.values()):
+                continue
+            stale = [
+                live_name for live_name, info in live.items()
+                if live_name != "_id_" and (live_name == name or list(info["key"]) == key)
+            ]
+            try:
+                await _replace_index(collection, model, stale)
+                print(f"Created index {collection_name}.{name}")
+            except OperationFailure as e:
+                if declared.get("unique"):
+                    raise RuntimeError(f"Required unique index {collection_name}.{name} could not be built: {e}") from e
+                print(f"Could not create index {collection_name}.{name}: {e}")
+
+
+def _index_model(name: str, info: dict) -> IndexModel:
+    """IndexModel for a live index as described by index_information()."""
+    options = {opt: info[opt] for opt in _INDEX_OPTIONS if opt in info}
+    if "sparse" in info:
+        options["sparse"] = info["sparse"]
+    return IndexModel(list(info["key"]), name=name, **options)
+
+
+async def _replace_index(collection, model: IndexModel, stale: list):
+    declared = model.document
+    if declared.get("unique"):
+        duplicate = await _find_duplicate(collection, declared)
+        if duplicate is not None:
+            raise OperationFailure(f"duplicate key {duplicate} already exists")
+
+    if declared["name"] in stale:
+        # Same name but different options: build alongside under another name. It
+        # keeps that name (Mongo has no rename); matching is by key and options.
+        staged = IndexModel(list(declared["key"].items()), **{
+            **{k: v for k, v in declared.items() if k not in ("key", "name")}, "name": f"{declared['name']}_next",
+        })
+    else:
+        staged = model
+    try:
+        await collection.create_indexes([staged])
+    except OperationFailure:
+        # Mongo refuses two indexes on one key with conflicting options; the old
+        # one has to go first. Should the new build still fail (e.g. a duplicate
+        # inserted since the check above), the old index is put back
+        old = await collection.index_information()
+        for live_name in stale:
+            await collection.drop_index(live_name)
+        try:
+            await collection.create_indexes([model])
+        except OperationFailure:
+            await collection.create_indexes([_index_model(live_name, old[live_name]) for live_name in stale])
+            raise
+        return
+
+    for live_name in stale:
+        await collection.drop_index(live_name)
+
+
+class RecordWriter:
+    """
+    Write-behind buffer for feedback records.
+
+    Handlers enqueue records and return immediately; a background task
+    batches them into unordered insert_many calls, flushing when the batch is
+    full or RECORD_FLUSH_INTERVAL seconds have passed. A full queue blocks
+    enqueue() (backpressure). Each record is stamped with inserted_at right
+    before its write (again when replayed); incremental exports follow it.
+    If Mongo rejects a batch and RECORD_JOURNAL_FILE is set, the records are
+    appended there as JSONL and replayed on next start; without it the loss
+    is logged with a count.
+    An error in one batch is logged and the loop carries on; should the task
+    die anyway, enqueue() writes records directly instead of queueing them
+    for nobody.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("RECORD_BATCH_SIZE", "100"))
+        self.flush_interval = float(os.getenv("RECORD_FLUSH_INTERVAL", "0.5"))
+        self.queue_size = int(os.getenv("RECORD_QUEUE_SIZE", "10000"))
+        journal = os.getenv("RECORD_JOURNAL_FILE")
+        self.journal_path = Path(journal) if journal else None
+        self._queue = None
+        self._task = None
+        self._in_flight = None  # batch being written; journaled if stop() has to cancel it
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def enqueue(self, record: dict):
+        self.start()
+        if self._task.done():
+            if not self._task.cancelled() and self._task.exception() is not None:
+                print(f"Record writer: background task died ({self._task.exception()!r}), writing directly")
+            await self._write([record])
+            return
+        await self._queue.put(record)
+
+    async def enqueue_many(self, records: list[dict]):
+        for record in records:
+            await self.enqueue(record)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._in_flight = batch
+            try:
+                await self._write(batch)
+                self._in_flight = None
+            except Exception as e:
+                self._in_flight = None
+                print(f"Record writer: batch of {len(batch)} records dropped ({e!r})")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: list[dict]):
+        now = datetime.utcnow()
+        for record in batch:
+            record["inserted_at"] = now
+        try:
+            with mongo_op_seconds.time(operation="feedback_records.insert_many"):
+                await feedback_records_collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            failed = [
+                batch[err["index"]]
+                for err in e.details.get("writeErrors", [])
+                if err.get("code") != DUPLICATE_KEY
+            ]
+            print(f"Record writer: {len(failed)} of {len(batch)} records failed to insert")
+            await self._spill(failed)
+        except Exception as e:
+            print(f"Record writer: insert_many failed ({e}); {len(batch)} records affected")
+            await self._spill(batch)
+
+    async def _spill(self, records: list[dict]):
+        if not records:
+            return
+        if self.journal_path is None:
+            print(f"Record writer: {len(records)} records lost (RECORD_JOURNAL_FILE not set)")
+            return
+        try:
+            # File I/O stays off the event loop
+            await asyncio.to_thread(self._append_journal, records)
+            print(f"Record writer: journaled {len(records)} records to {self.journal_path}")
+        except OSError as e:
+            print(f"Record writer: could not journal {len(records)} records ({e}); they are lost")
+
+    def _append_journal(self, records: list[dict]):
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal_path.open("a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json_util.dumps(record) + "\n")
+
+    async def replay_journal(self):
+        """Re-insert records spilled by a previous run. Safe to repeat: records keep their _id."""
+        if self.journal_path is None or not self.journal_path.exists():
+            return
+        with self.journal_path.open("r", encoding="utf-8") as f:
+            records = [json_util.loads(line) for line in f if line.strip()]
+        if not records:
+            return
+        now = datetime.utcnow()
+        for record in records:
+            record["inserted_at"] = now
+        try:
+            await feedback_records_collection.insert_many(records, ordered=False)
+        except BulkWriteError as e:
+            if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                print(f"Record writer: journal replay incomplete, keeping {self.journal_path}")
+                return
+        except Exception as e:
+            print(f"Record writer: journal replay failed ({e}), keeping {self.journal_path}")
+            return
+        self.journal_path.unlink()
+        print(f"Record writer: replayed {len(records)} journaled records")
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Flush everything still queued, then stop the background task. On timeout,
+        the queued records and the batch being written are journaled (re-inserting
+        one that did land is a no-op on replay, since records keep their _id).
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            print(f"Record writer: flush timed out with {len(pending)} records queued")
+        else:
+            pending = []
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        if self._in_flight:
+            pending = self._in_flight + pending
+            self._in_flight = None
+        await self._spill(pending)
+        self._task = None
+
+
+record_writer = RecordWriter()
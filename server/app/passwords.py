@@ -0,0 +1,83 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import bcrypt
+
+from app.metrics import registry
+
+# bcrypt cost factor for new hashes; stored hashes with another cost are rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Password hashes computed at once per worker; further logins wait their turn
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+password_hash_seconds = registry.histogram(
+    "password_hash_duration_seconds", "bcrypt work, including time queued for the executor", ("operation",)
+)
+
+
+def hash_rounds(hashed: bytes) -> int:
+    """Cost factor of a stored bcrypt hash ($2b$<rounds>$...)."""
+    try:
+        return int(hashed.split(b"$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so hashing never blocks the
+    event loop. bcrypt releases the GIL, so other requests keep being served
+    while up to PASSWORD_HASH_WORKERS hashes run; a burst of logins queues here
+    instead of starving the rest of the API.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = PASSWORD_HASH_WORKERS):
+        self.rounds = rounds
+        self.workers = workers
+        self._executor = None
+        self._rehash_tasks = set()
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def hash(self, password: str) -> bytes:
+        with password_hash_seconds.time(operation="hash"):
+            return await self._run(bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(self.rounds))
+
+    async def verify(self, password: str, hashed: bytes) -> bool:
+        with password_hash_seconds.time(operation="verify"):
+            return await self._run(bcrypt.checkpw, password.encode("utf-8"), hashed)
+
+    def needs_rehash(self, hashed: bytes) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    def schedule_rehash(self, users_collection, user_id, password: str, old_hash: bytes):
+        """
+        Re-hash a just-verified password at the current cost in the background.
+        The update only applies if the stored hash is still the one we verified.
+        """
+        async def rehash():
+            try:
+                new_hash = await self.hash(password)
+                await users_collection.update_one(
+                    {"_id": user_id, "password": old_hash},
+                    {"$set": {"password": new_hash, "updated_at": datetime.utcnow()}},
+                )
+            except Exception as e:
+                print(f"Password rehash failed for user {user_id}: {e!r}")
+
+        task = asyncio.ensure_future(rehash())
+        self._rehash_tasks.add(task)
+        task.add_done_callback(self._rehash_tasks.discard)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
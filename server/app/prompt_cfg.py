@@ -1,43 +1,138 @@
+import hashlib
 import os
 from pathlib import Path
+from typing import NamedTuple, Optional
 import yaml
 
 DEFAULT_PROMPT_FILE = Path(__file__).parent / "prompts.yaml"
 print("Default prompt file path:", DEFAULT_PROMPT_FILE)
 DEFAULT_PROFILE = "default"
 
+# Option bits used to index the precompiled prompt table
+OPTION_BITS = {"simplify": 1, "soften": 2, "actionable": 4}
+
+
+def active_profile() -> str:
+    return os.getenv("PROMPT_PROFILE", DEFAULT_PROFILE)
+
+
+def prompt_path() -> Path:
+    # Allow override by env var
+    return Path(os.getenv("PROMPT_FILE", str(DEFAULT_PROMPT_FILE)))
+
+
+def option_mask(options: dict) -> int:
+    mask = 0
+    for name, bit in OPTION_BITS.items():
+        if options and options.get(name):
+            mask |= bit
+    return mask
+
+
+class CompiledPrompt(NamedTuple):
+    system: str
+    user_prefix: str
+
+    def user_prompt(self, text: str) -> str:
+        # Same result as build_user_prompt(): the instruction block never starts with whitespace
+        return self.user_prefix + text.rstrip()
+
+
+class PromptSnapshot(NamedTuple):
+    data: dict
+    mtime: float
+    version: str
+    table: dict  # {(profile, option mask): CompiledPrompt}
+
+
+def compile_profiles(data: dict) -> dict:
+    table = {}
+    for profile, profile_cfg in data.items():
+        if not isinstance(profile_cfg, dict):
+            raise ValueError(f"Prompt profile '{profile}' must be a mapping")
+        system = build_system_prompt(profile_cfg)
+        for mask in range(1 << len(OPTION_BITS)):
+            options = {name: bool(mask & bit) for name, bit in OPTION_BITS.items()}
+            user_prefix = build_user_prompt("", options, profile_cfg) + "\n"
+            table[(profile, mask)] = CompiledPrompt(system, user_prefix)
+    return table
+
 
 class PromptStore:
+    """
+    Holds a validated, precompiled snapshot of prompts.yaml.
+
+    Requests read the current snapshot without touching the filesystem;
+    reload_if_changed() (driven by the config watcher) swaps in a new one
+    when the file changes. A file that fails to parse or compile is
+    rejected and the previous snapshot stays active.
+    """
+
     def __init__(self):
-        self._cache = None
-        self._cache_mtime = None
+        self._rejected_mtime = None
+        self._snapshot: Optional[PromptSnapshot] = None
 
-    def load(self):
-        # Allow override by env var
-        prompt_path = Path(os.getenv("PROMPT_FILE", str(DEFAULT_PROMPT_FILE)))
-        profile = os.getenv("PROMPT_PROFILE", DEFAULT_PROFILE)
+    def _read(self, path: Path) -> PromptSnapshot:
+        if not path.exists():
+            raise RuntimeError(
+                f"Prompt file not found: {path}\n"
+                f"Contents of directory: {list(path.parent.glob('*'))}"
+            )
+        mtime = path.stat().st_mtime
+        raw = path.read_bytes()
+        data = yaml.safe_load(raw) or {}
+        if not isinstance(data, dict):
+            raise RuntimeError(f"Prompt file {path} must contain a mapping of profiles")
+        return PromptSnapshot(data, mtime, hashlib.sha256(raw).hexdigest()[:16], compile_profiles(data))
+
+    def snapshot(self) -> PromptSnapshot:
+        if self._snapshot is None:
+            self._snapshot = self._read(prompt_path())
+        return self._snapshot
+
+    def reload_if_changed(self) -> bool:
+        path = prompt_path()
+        current = self._snapshot
+        mtime = None
+        try:
+            mtime = path.stat().st_mtime
+            if (current is not None and mtime == current.mtime) or mtime == self._rejected_mtime:
+                return False
+            snapshot = self._read(path)
+            if active_profile() not in snapshot.data:
+                raise RuntimeError(f"active profile '{active_profile()}' missing")
+        except Exception as e:
+            self._rejected_mtime = mtime
+            print(f"Prompt reload rejected, keeping previous prompts: {e}")
+            return False
+        self._snapshot = snapshot
+        return True
+
+    @property
+    def version(self) -> str:
+        return self.snapshot().version
 
-        if not prompt_path.exists():
+    def load(self):
+        snapshot = self.snapshot()
+        profile = active_profile()
+        if profile not in snapshot.data:
             raise RuntimeError(
-                f"Prompt file not found: {prompt_path}\n"
-                f"Contents of directory: {list(prompt_path.parent.glob('*'))}"
+                f"Prompt profile '{profile}' not found in {prompt_path()}. "
+                f"Available: {', '.join(snapshot.data.keys())}"
             )
-        # Hot-reload when file changes (nice for dev)
-        mtime = prompt_path.stat().st_mtime
-        if self._cache is None or self._cache_mtime != mtime:
-            with prompt_path.open("r", encoding="utf-8") as f:
-                data = yaml.safe_load(f) or {}
-            self._cache = data
-            self._cache_mtime = mtime
-
-        if profile not in self._cache:
+        return snapshot.data[profile]
+
+    def compiled(self, options: dict) -> CompiledPrompt:
+        snapshot = self.snapshot()
+        profile = active_profile()
+        try:
+            return snapshot.table[(profile, option_mask(options))]
+        except KeyError:
             raise RuntimeError(
-                f"Prompt profile '{profile}' not found in {prompt_path}. "
-                f"Available: {', '.join(self._cache.keys())}"
+                f"Prompt profile '{profile}' not found in {prompt_path()}. "
+                f"Available: {', '.join(snapshot.data.keys())}"
             )
 
-        return self._cache[profile]
-
 
 prompt_store = PromptStore()
 
@@ -0,0 +1,242 @@
+import math
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, Request, status
+from pymongo import ReturnDocument
+
+from app import mongodb
+from app.metrics import mongo_op_seconds, rate_limit_rejections_total
+from app.model_cfg import model_config_store
+from app.tracing import span
+
+
+class Policy(NamedTuple):
+    name: str
+    capacity: float      # bucket size (requests, or estimated LLM tokens for cost-based policies)
+    per_seconds: float   # time to refill an empty bucket
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float   # seconds until the requested cost fits; 0 when allowed
+    charged: float = 0.0  # cost actually taken from the bucket; settle adjust() against this
+
+
+def _decision(policy: Policy, tokens: float, allowed: bool, cost: float) -> Decision:
+    retry_after = 0.0 if allowed else max(0.0, (cost - tokens) / policy.rate)
+    return Decision(allowed, max(0.0, tokens), retry_after)
+
+
+class MemoryBackend:
+    """
+    Token buckets in an LRU dict: one (tokens, updated_at, full_at) entry per key.
+    A bucket that has refilled completely is the same as no bucket, so idle keys
+    at the front of the LRU are dropped as soon as they are full, and the dict never
+    grows past max_keys. Only touched from the event loop, so no lock is needed.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()
+
+    def _evict(self, now: float):
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    async def apply(self, policy: Policy, key: str, cost: float, force: bool) -> Decision:
+        now = time.monotonic()
+        bucket_key = (policy.name, key)
+        entry = self._buckets.pop(bucket_key, None)
+        if entry is None:
+            tokens = policy.capacity
+        else:
+            tokens, updated_at, _ = entry
+            tokens = min(policy.capacity, tokens + (now - updated_at) * policy.rate)
+
+        allowed = force or tokens >= cost
+        if allowed:
+            tokens = min(policy.capacity, tokens - cost)
+        self._buckets[bucket_key] = (tokens, now, now + (policy.capacity - tokens) / policy.rate)
+        self._evict(now)
+        return _decision(policy, tokens, allowed, cost)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class MongoBackend:
+    """
+    Token buckets shared by every worker, one document per key in `rate_limits`.
+    Refill, check and charge happen in a single find_one_and_update with a pipeline
+    update (MongoDB 4.2+) timed by the server clock ($$NOW), so concurrent workers
+    cannot both spend the same tokens. expires_at is when the bucket would be full
+    again; the TTL index removes idle documents after that.
+    """
+
+    async def apply(self, policy: Policy, key: str, cost: float, force: bool) -> Decision:
+        rate_per_ms = policy.rate / 1000.0
+        refilled = {"$min": [policy.capacity, {"$add": [
+            {"$ifNull": ["$tokens", policy.capacity]},
+            {"$multiply": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, rate_per_ms]},
+        ]}]}
+        pipeline = [
+            {"$set": {"tokens": refilled}},
+            {"$set": {"allowed": {"$or": [{"$literal": force}, {"$gte": ["$tokens", cost]}]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$min": [policy.capacity, {"$subtract": ["$tokens", cost]}]}, "$tokens"]},
+                "updated_at": "$$NOW",
+            }},
+            {"$set": {"expires_at": {"$add": [
+                "$$NOW", {"$multiply": [{"$subtract": [policy.capacity, "$tokens"]}, 1 / rate_per_ms]},
+            ]}}},
+        ]
+        with mongo_op_seconds.time(operation="rate_limits.find_one_and_update"):
+            doc = await mongodb.rate_limits_collection.find_one_and_update(
+                {"_id": f"{policy.name}:{key}"}, pipeline, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        return _decision(policy, doc["tokens"], doc["allowed"], cost)
+
+
+class RateLimiter:
+    """
+    Per-route token-bucket rate limiting.
+
+    Policies come from the `rate_limits` section of model_config.yaml: each names
+    a bucket of `capacity` units that refills over `per_seconds`. Request-count
+    policies spend 1 unit per call; the interpret policy spends estimated LLM
+    tokens. The backend is in-memory (per worker) or Mongo (shared by all workers).
+    If the Mongo backend errors, requests are allowed rather than failed.
+    """
+
+    def __init__(self):
+        self._memory: Optional[MemoryBackend] = None
+        self._mongo = MongoBackend()
+
+    def settings(self) -> dict:
+        return model_config_store.load().get("rate_limits") or {}
+
+    def policy(self, name: str) -> Optional[Policy]:
+        settings = self.settings()
+        if not settings.get("enabled", True):
+            return None
+        cfg = (settings.get("policies") or {}).get(name)
+        if not cfg:
+            return None
+        return Policy(name, float(cfg.get("capacity", 20)), float(cfg.get("per_seconds", 3600)))
+
+    def _backend(self):
+        settings = self.settings()
+        if settings.get("backend", "memory") == "mongo":
+            return self._mongo
+        max_keys = int(settings.get("max_keys", 100_000))
+        if self._memory is None:
+            self._memory = MemoryBackend(max_keys)
+        self._memory.max_keys = max_keys
+        return self._memory
+
+    async def _apply(self, policy: Policy, key: str, cost: float, force: bool) -> Decision:
+        try:
+            return await self._backend().apply(policy, key, cost, force)
+        except Exception as e:
+            print(f"Rate limiter backend error, allowing request: {e!r}")
+            return Decision(True, policy.capacity, 0.0)
+
+    async def acquire(self, name: str, key: str, cost: float = 1.0) -> Decision:
+        """Spend cost from the key's bucket if it fits."""
+        policy = self.policy(name)
+        if policy is None:
+            return Decision(True, math.inf, 0.0)
+        # A request bigger than the whole bucket needs a full bucket rather than never fitting
+        cost = min(cost, policy.capacity)
+        decision = await self._apply(policy, key, cost, force=False)
+        return decision._replace(charged=cost if decision.allowed else 0.0)
+
+    async def adjust(self, name: str, key: str, amount: float):
+        """
+        Settle a reservation afterwards: positive charges more (may go into debt),
+        negative refunds. Compute it from Decision.charged, not the requested cost.
+        """
+        policy = self.policy(name)
+        if policy is not None and amount:
+            await self._apply(policy, key, amount, force=True)
+
+    async def enforce(self, name: str, key: str, route: str, cost: float = 1.0) -> Decision:
+        """acquire() or raise 429 with Retry-After."""
+        with span("rate_limit"):
+            decision = await self.acquire(name, key, cost)
+        if not decision.allowed:
+            rate_limit_rejections_total.inc(route=route)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded. Try again in {math.ceil(decision.retry_after)} seconds.",
+                headers={"Retry-After": str(math.ceil(decision.retry_after))},
+            )
+        return decision
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.settings().get("backend", "memory"),
+            "memory_keys": len(self._memory) if self._memory is not None else 0,
+        }
+
+
+def client_key(request: Request, claims: Optional[dict] = None) -> str:
+    """Bucket key: the token subject for signed-in users, otherwise the client IP."""
+    if claims and claims.get("sub"):
+        return f"user:{claims['sub']}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def interpret_cost(text: str, max_tokens: Optional[int] = None) -> float:
+    """Estimated LLM tokens for one rewrite: the input plus the expected output."""
+    cfg = (rate_limiter.settings().get("policies") or {}).get("interpret") or {}
+    input_tokens = len(text) / float(cfg.get("chars_per_token", 4.0))
+    output_tokens = input_tokens * float(cfg.get("output_ratio", 1.5))
+    if max_tokens:
+        output_tokens = min(output_tokens, max_tokens)
+    return min(math.ceil(input_tokens + output_tokens), float(cfg.get("capacity", math.inf)))
+
+
+# LLM tokens spent by the current request beyond its own answers (cancelled
+# hedge duplicates). A list so tasks started by the request add to the same total.
+_extra_cost: ContextVar[Optional[list]] = ContextVar("extra_llm_cost", default=None)
+
+
+@contextmanager
+def track_extra_cost():
+    """Collect charge_extra_cost() calls made while handling one request; read box[0] afterwards."""
+    box = [0.0]
+    token = _extra_cost.set(box)
+    try:
+        yield box
+    finally:
+        _extra_cost.reset(token)
+
+
+def charge_extra_cost(tokens: float):
+    box = _extra_cost.get()
+    if box is not None:
+        box[0] += tokens
+
+
+def actual_interpret_cost(text: str, output: str, cache_status: str) -> float:
+    """Cost to settle after generating: nothing for answers served without a new LLM call."""
+    if cache_status in ("memory", "mongo", "coalesced"):
+        return 0
+    cfg = (rate_limiter.settings().get("policies") or {}).get("interpret") or {}
+    return math.ceil((len(text) + len(output)) / float(cfg.get("chars_per_token", 4.0)))
+
+
+rate_limiter = RateLimiter()
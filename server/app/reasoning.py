@@ -0,0 +1,71 @@
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+def _partial_suffix(buf: str, tag: str) -> int:
+    """Length of the longest suffix of `buf` that is a proper prefix of `tag`."""
+    for n in range(min(len(buf), len(tag) - 1), 0, -1):
+        if buf.endswith(tag[:n]):
+            return n
+    return 0
+
+
+class ThinkStripper:
+    """
+    Incremental <think>...</think> remover for streamed completions.
+
+    Tags may be split across chunks, so any trailing text that could still
+    turn into a tag is held back until the next chunk decides it. Leading
+    whitespace is dropped so the first visible token is real content.
+    An unterminated reasoning block is discarded at flush().
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._inside = False
+        self._started = False
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if text:
+                self._started = True
+        return text
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk
+        out = []
+        while True:
+            if not self._inside:
+                idx = self._buf.find(THINK_OPEN)
+                if idx >= 0:
+                    out.append(self._buf[:idx])
+                    self._buf = self._buf[idx + len(THINK_OPEN):]
+                    self._inside = True
+                    continue
+                keep = _partial_suffix(self._buf, THINK_OPEN)
+                cut = len(self._buf) - keep
+                out.append(self._buf[:cut])
+                self._buf = self._buf[cut:]
+                break
+            else:
+                idx = self._buf.find(THINK_CLOSE)
+                if idx >= 0:
+                    self._buf = self._buf[idx + len(THINK_CLOSE):]
+                    self._inside = False
+                    continue
+                keep = _partial_suffix(self._buf, THINK_CLOSE)
+                self._buf = self._buf[len(self._buf) - keep:]
+                break
+        return self._emit("".join(out))
+
+    def flush(self) -> str:
+        rest = "" if self._inside else self._buf
+        self._buf = ""
+        return self._emit(rest)
+
+
+def strip_thinking(text: str) -> str:
+    """Remove <think>...</think> blocks from a complete completion."""
+    stripper = ThinkStripper()
+    return (stripper.feed(text) + stripper.flush()).strip()
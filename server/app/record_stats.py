@@ -0,0 +1,124 @@
+import math
+import os
+import time
+
+from app import mongodb
+from app.metrics import mongo_op_seconds
+from app.singleflight import SingleFlight
+
+# Seconds a computed stats result is served before the pipelines run again
+RECORD_STATS_TTL = float(os.getenv("RECORD_STATS_TTL", "30"))
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+TOP_USERS = 20
+
+# output_length / input_length rounded to 0.01 (so the ratio histogram stays small);
+# floor(x * 100 + 0.5) / 100 rather than $round, which needs MongoDB 4.2+
+_RATIO = {"$divide": [
+    {"$floor": {"$add": [{"$multiply": [{"$divide": ["$output_length", "$input_length"]}, 100]}, 0.5]}},
+    100,
+]}
+
+
+def _histogram_stage(value) -> list[dict]:
+    """Counts per distinct value, ascending; percentiles are read off it without shipping every row."""
+    return [
+        {"$group": {"_id": value, "n": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def _summary(histogram: list[dict]) -> dict:
+    values = [(h["_id"], h["n"]) for h in histogram if h["_id"] is not None]
+    total = sum(n for _, n in values)
+    if not total:
+        return {"count": 0, "mean": None, "min": None, "max": None,
+                **{f"p{int(q * 100)}": None for q in PERCENTILES}}
+
+    summary = {
+        "count": total,
+        "mean": sum(v * n for v, n in values) / total,
+        "min": values[0][0],
+        "max": values[-1][0],
+    }
+    targets = [(q, math.ceil(q * total) - 1) for q in PERCENTILES]  # nearest-rank index per percentile
+    seen = 0
+    for value, n in values:
+        seen += n
+        while targets and targets[0][1] < seen:
+            q, _ = targets.pop(0)
+            summary[f"p{int(q * 100)}"] = value
+    return summary
+
+
+class RecordStats:
+    """
+    Usage statistics for feedback_records, computed in one $facet aggregation
+    on the server and cached for RECORD_STATS_TTL seconds per filter. Concurrent
+    requests for the same filter during a refresh share one aggregation.
+    """
+
+    def __init__(self, ttl: float = RECORD_STATS_TTL):
+        self.ttl = ttl
+        self._cache: dict[tuple, tuple[float, dict]] = {}
+        self._flight = SingleFlight()
+
+    def pipeline(self, query: dict) -> list[dict]:
+        return [
+            {"$match": query},
+            {"$facet": {
+                "total": [{"$count": "n"}],
+                "by_methods": [
+                    {"$group": {"_id": "$methods", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}},
+                ],
+                "by_user": [
+                    {"$group": {"_id": {"$ifNull": ["$user_email", "Guest"]}, "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}},
+                    {"$limit": TOP_USERS},
+                ],
+                "by_day": [
+                    {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                                "count": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}},
+                ],
+                "input_length": _histogram_stage({"$ifNull": ["$input_length", 0]}),
+                "output_length": _histogram_stage({"$ifNull": ["$output_length", 0]}),
+                "ratio": [{"$match": {"input_length": {"$gt": 0}}}] + _histogram_stage(_RATIO),
+            }},
+        ]
+
+    async def _compute(self, query: dict) -> dict:
+        with mongo_op_seconds.time(operation="feedback_records.aggregate_stats"):
+            cursor = mongodb.feedback_records_collection.aggregate(self.pipeline(query), allowDiskUse=True)
+            facets = (await cursor.to_list(1))[0]
+
+        total = facets["total"][0]["n"] if facets["total"] else 0
+        return {
+            "total": total,
+            "by_methods": [{"methods": f["_id"] or [], "count": f["count"]} for f in facets["by_methods"]],
+            "by_user": [{"user_email": f["_id"], "count": f["count"]} for f in facets["by_user"]],
+            "by_day": [{"day": f["_id"], "count": f["count"]} for f in facets["by_day"]],
+            "input_length": _summary(facets["input_length"]),
+            "output_length": _summary(facets["output_length"]),
+            "output_input_ratio": _summary(facets["ratio"]),
+        }
+
+    async def get(self, key: tuple, query: dict) -> dict:
+        """Stats for query; key identifies the filter for caching."""
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > now:
+            return {**entry[1], "cached": True}
+
+        async def refresh():
+            result = await self._compute(query)
+            result["computed_at"] = time.time()
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > time.monotonic()}
+            self._cache[key] = (time.monotonic() + self.ttl, result)
+            return result
+
+        result, shared = await self._flight.do(repr(key), refresh)
+        return {**result, "cached": shared}
+
+
+record_stats = RecordStats()
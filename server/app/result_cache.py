@@ -0,0 +1,143 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.model_cfg import model_config_store
+from app.prompt_cfg import prompt_store, active_profile
+from app import mongodb
+from app.metrics import interpret_cache_total, mongo_op_seconds
+
+_HSPACE_RE = re.compile(r"[ \t]+")
+
+
+def normalize_text(text: str) -> str:
+    text = text.replace("\r\n", "\n").strip()
+    return _HSPACE_RE.sub(" ", text)
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def config_fingerprint() -> str:
+    """Hash of the active prompt profile and the prompts.yaml / model_config.yaml versions."""
+    return _digest({"profile": active_profile(), "prompts": prompt_store.version, "models": model_config_store.version})
+
+
+def request_key(text: str, options: dict, model: str, params: dict, fingerprint: Optional[str] = None) -> str:
+    """Identity of one interpret call: same key means the same prompt sent to the same model."""
+    options_key = sorted(k for k, v in (options or {}).items() if v)
+    return _digest({
+        "text": normalize_text(text),
+        "options": options_key,
+        "model": model,
+        "params": params,
+        "config": fingerprint or config_fingerprint(),
+    })
+
+
+class ResultCache:
+    """
+    Two-tier cache for interpret outputs.
+
+    Tier 1 is a bounded in-process LRU with TTL; tier 2 is the
+    `interpret_cache` Mongo collection (TTL-indexed) so entries survive restarts.
+    Keys hash the normalized text, selected options, model, prompt profile
+    (name and file version) and generation params, so editing prompts.yaml or
+    model_config.yaml naturally stops old entries from matching. Settings come
+    from the `cache` section of model_config.yaml.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._fingerprint = None
+
+    def _settings(self) -> dict:
+        return model_config_store.load().get("cache") or {}
+
+    def key_for(self, text: str, options: dict, model: str, params: dict, bypass: bool = False) -> Optional[str]:
+        """Cache key for one interpret call, or None when caching does not apply."""
+        settings = self._settings()
+        if bypass or not settings.get("enabled", True):
+            return None
+        if (params.get("temperature") or 0) > 0 and not settings.get("allow_nonzero_temperature", False):
+            return None
+
+        # Per-call params (e.g. a chunk's max_tokens) only go into the key; clearing
+        # is for config edits, after which no old entry can match again
+        fingerprint = config_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+        return request_key(text, options, model, params, fingerprint=fingerprint)
+
+    async def lookup(self, key: Optional[str]) -> tuple[Optional[str], str]:
+        """Return (output, status) where status is memory / mongo / miss / bypass."""
+        output, status = await self._lookup(key)
+        interpret_cache_total.inc(status=status)
+        return output, status
+
+    async def _lookup(self, key: Optional[str]) -> tuple[Optional[str], str]:
+        if key is None:
+            return None, "bypass"
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, output = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return output, "memory"
+            del self._entries[key]
+
+        settings = self._settings()
+        if settings.get("mongo", True):
+            try:
+                with mongo_op_seconds.time(operation="interpret_cache.find_one"):
+                    doc = await mongodb.interpret_cache_collection.find_one(
+                        {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+                    )
+            except Exception as e:
+                print(f"Result cache lookup failed: {e}")
+                doc = None
+            if doc:
+                self._remember(key, doc["output"], settings)
+                return doc["output"], "mongo"
+
+        return None, "miss"
+
+    def _remember(self, key: str, output: str, settings: dict):
+        ttl = float(settings.get("ttl_s", 3600))
+        self._entries[key] = (time.monotonic() + ttl, output)
+        self._entries.move_to_end(key)
+        max_entries = int(settings.get("max_entries", 1024))
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+
+    async def store(self, key: Optional[str], output: str):
+        if key is None or not output:
+            return
+        settings = self._settings()
+        self._remember(key, output, settings)
+
+        if settings.get("mongo", True):
+            now = datetime.utcnow()
+            try:
+                await mongodb.interpret_cache_collection.replace_one(
+                    {"_id": key},
+                    {
+                        "output": output,
+                        "created_at": now,
+                        "expires_at": now + timedelta(seconds=float(settings.get("mongo_ttl_s", 7 * 24 * 3600))),
+                    },
+                    upsert=True,
+                )
+            except Exception as e:
+                print(f"Result cache store failed: {e}")
+
+
+result_cache = ResultCache()
@@ -0,0 +1,211 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+from groq import RateLimitError
+
+from app.llm import llm_client
+from app.metrics import llm_hedges_total, llm_hedge_tokens_total
+from app.model_cfg import model_config_store
+from app.ratelimit import charge_extra_cost
+
+AUTO_MODEL = "auto"
+
+
+class ModelStats:
+    """Rolling latency / error window for one model."""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success
+        self.rate_limited_until = 0.0
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+    def record_error(self):
+        self.outcomes.append(False)
+
+    def percentile(self, q: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def available(self, now: float) -> bool:
+        return now >= self.rate_limited_until
+
+
+class ModelRouter:
+    """
+    Latency-aware model selection with hedged requests.
+
+    Every call records latency and errors per model. For requests with
+    model "auto", the router picks the healthiest model and, if the primary has
+    not answered by its observed p95, sends a duplicate to the next best
+    model; the first successful answer wins and the other call is cancelled.
+    Latency and the hedge timer start once llm_client grants a concurrency
+    slot, so local queueing is not mistaken for a slow model, and no duplicate
+    is sent while every slot is busy. A cancelled duplicate's estimated tokens
+    are charged to the request's rate-limit budget.
+    Settings come from the `routing` section of model_config.yaml.
+    """
+
+    def __init__(self):
+        self._stats: dict[str, ModelStats] = {}
+
+    def _settings(self) -> dict:
+        return model_config_store.load().get("routing") or {}
+
+    def stats_for(self, model: str) -> ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = ModelStats(int(self._settings().get("window", 200)))
+        return stats
+
+    def _candidates(self) -> list[str]:
+        cfg = model_config_store.load()
+        return self._settings().get("candidates") or cfg.get("available_models", [])
+
+    def ranked(self, exclude: str | None = None) -> list[str]:
+        """Healthy candidates, fastest first. Models without enough samples keep their configured order."""
+        settings = self._settings()
+        min_samples = int(settings.get("min_samples", 5))
+        now = time.monotonic()
+
+        def score(item):
+            index, model = item
+            stats = self.stats_for(model)
+            if len(stats.latencies) < min_samples:
+                return (1, index)
+            return (0, stats.percentile(0.5) * (1 + 4 * stats.error_rate))
+
+        models = [
+            (i, m) for i, m in enumerate(self._candidates())
+            if m != exclude and self.stats_for(m).available(now)
+        ]
+        return [m for _, m in sorted(models, key=score)]
+
+    def pick(self) -> str | None:
+        ranked = self.ranked()
+        if ranked:
+            return ranked[0]
+        candidates = self._candidates()
+        return candidates[0] if candidates else None
+
+    async def _timed_chat(self, model: str, messages: list[dict], params: dict, started: asyncio.Event | None = None):
+        stats = self.stats_for(model)
+        start = None
+
+        def on_start():
+            nonlocal start
+            start = time.perf_counter()
+            if started is not None:
+                started.set()
+
+        try:
+            resp = await llm_client.chat(model=model, messages=messages, on_start=on_start, **params)
+        except RateLimitError:
+            stats.record_error()
+            stats.rate_limited_until = time.monotonic() + float(self._settings().get("rate_limit_cooldown_s", 30))
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record_success(time.perf_counter() - start)
+        return resp
+
+    def _hedge_delay(self, model: str) -> float:
+        settings = self._settings()
+        stats = self.stats_for(model)
+        if len(stats.latencies) < int(settings.get("min_samples", 5)):
+            return float(settings.get("hedge_delay_s", 4.0))
+        return stats.percentile(0.95)
+
+    async def chat(self, model: str, messages: list[dict], params: dict, hedge: bool = False):
+        """Returns (response, model that answered)."""
+        settings = self._settings()
+        secondary = None
+        if hedge and settings.get("hedge", True):
+            ranked = self.ranked(exclude=model)
+            secondary = ranked[0] if ranked else None
+
+        if secondary is None:
+            return await self._timed_chat(model, messages, params), model
+
+        started = asyncio.Event()
+        primary_task = asyncio.ensure_future(self._timed_chat(model, messages, params, started))
+        tasks = {primary_task: model}
+        try:
+            # The hedge timer runs from when the primary gets a slot, not while it queues
+            started_wait = asyncio.ensure_future(started.wait())
+            await asyncio.wait({primary_task, started_wait}, return_when=asyncio.FIRST_COMPLETED)
+            started_wait.cancel()
+            done, _ = await asyncio.wait({primary_task}, timeout=self._hedge_delay(model))
+            if done and primary_task.exception() is None:
+                return primary_task.result(), model
+            if not done and llm_client.saturated:
+                # A duplicate would only queue behind (and add to) the overload
+                return await primary_task, model
+
+            # Primary is slow (or already failed): race a duplicate on the secondary
+            llm_hedges_total.inc(model=secondary)
+            tasks[asyncio.ensure_future(self._timed_chat(secondary, messages, params))] = secondary
+            pending = {t for t in tasks if not t.done()}
+            first_error = primary_task.exception() if primary_task.done() else None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._charge_cancelled(tasks, task, messages)
+                        return task.result(), tasks[task]
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _charge_cancelled(tasks: dict, winner: asyncio.Future, messages: list[dict]):
+        """
+        The provider keeps working on (and bills) a call we cancel, so charge
+        each still-running loser about what the winning call used.
+        """
+        resp = winner.result()
+        usage = getattr(resp, "usage", None)
+        if usage is not None and usage.total_tokens:
+            tokens = float(usage.total_tokens)
+        else:
+            chars = sum(len(m.get("content") or "") for m in messages) + len(resp.choices[0].message.content or "")
+            tokens = float(math.ceil(chars / 4))
+        for task, model in tasks.items():
+            if task is not winner and not task.done():
+                llm_hedge_tokens_total.inc(tokens, model=model)
+                charge_extra_cost(tokens)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            model: {
+                "samples": len(s.latencies),
+                "p50_s": s.percentile(0.5),
+                "p95_s": s.percentile(0.95),
+                "error_rate": s.error_rate,
+                "rate_limited": not s.available(now),
+            }
+            for model, s in self._stats.items()
+        }
+
+
+model_router = ModelRouter()
@@ -0,0 +1,66 @@
+import asyncio
+
+from app.metrics import registry
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive while it is still running await the same task instead of starting
+    another one. The task is shielded so a disconnecting caller does not
+    cancel the result for everyone else.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _done(self, key: str, task: asyncio.Future):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every waiter went away
+
+    async def do(self, key: str, factory):
+        """Run factory() once per key at a time. Returns (result, shared)."""
+        task, shared = self.join(key, factory)
+        return await asyncio.shield(task), shared
+
+    def join(self, key: str, factory) -> tuple[asyncio.Future, bool]:
+        """
+        Like do(), but return the (leader's) task without awaiting it, for a
+        leader that consumes progress while the work runs. Await it through
+        asyncio.shield() so leaving early does not cancel it for the others.
+        """
+        task = self._pending.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(factory())
+            self._pending[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return task, shared
+
+    def stats(self) -> dict:
+        total = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._pending),
+            "coalesced_ratio": (self.coalesced / total) if total else 0.0,
+        }
+
+
+interpret_flight = SingleFlight()
+
+registry.gauge(
+    "interpret_singleflight_calls",
+    "Interpret LLM calls started (leader) vs attached to an identical in-flight call (coalesced)",
+    ("result",),
+    lambda: {("leader",): interpret_flight.calls, ("coalesced",): interpret_flight.coalesced},
+)
@@ -0,0 +1,113 @@
+import json
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+# Fraction of requests that record spans, return Server-Timing and log a trace line
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.spans: list[tuple[str, float]] = []  # (name, seconds)
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in self.spans]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def span(name: str):
+    """Time one stage of the current request. A no-op when the request is not sampled."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, time.perf_counter() - start))
+
+
+def mark(name: str, since: float):
+    """Record a span from `since` (a time.perf_counter() value) to now, for stages that do not fit a with block."""
+    trace = _current.get()
+    if trace is not None:
+        trace.spans.append((name, time.perf_counter() - since))
+
+
+def timings() -> Optional[dict]:
+    """Span durations so far in ms, by name, or None when the request is not sampled."""
+    trace = _current.get()
+    if trace is None:
+        return None
+    return {name: round(secs * 1000, 1) for name, secs in trace.spans}
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current.get()
+    return trace.request_id if trace else None
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that gives each request an id (X-Request-ID, reused if the
+    client sent one) and, for sampled requests, collects span() timings,
+    returns them as a Server-Timing header and prints one JSON trace line.
+    For streamed responses the header only covers stages finished before the
+    first byte; the log line covers the whole request.
+    """
+
+    def __init__(self, app, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        trace = Trace(request_id, scope.get("method", ""), scope.get("path", ""))
+        token = _current.set(trace if sampled else None)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                extra = [(b"x-request-id", request_id.encode("latin-1"))]
+                if sampled:
+                    extra.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": list(message.get("headers") or []) + extra}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if sampled:
+                route = scope.get("route")
+                print(json.dumps({
+                    "ts": datetime.utcnow().isoformat() + "Z",
+                    "request_id": request_id,
+                    "method": trace.method,
+                    "route": getattr(route, "path", None) or trace.path,
+                    "status": status["code"],
+                    "duration_ms": round((time.perf_counter() - trace.start) * 1000, 1),
+                    "spans": [{"name": n, "ms": round(s * 1000, 1)} for n, s in trace.spans],
+                }), flush=True)
@@ -1,48 +1,66 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Request
-from fastapi.security import HTTPBearer
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-import bcrypt
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import time
-from collections import defaultdict
-
-# Rate limiting storage (in-memory for simplicity)
-user_requests = defaultdict(list)
-RATE_LIMIT = 20  # 20 requests per user per hour
-RATE_WINDOW = 3600  # 1 hour window in seconds
+from collections import OrderedDict
+from app.metrics import mongo_op_seconds
+from app.ratelimit import rate_limiter
+from app.passwords import password_hasher
+from app.tracing import span
+from app.dates import naive_utc
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 SECRET_KEY = "your-secret-key-here"
 ALGORITHM = "HS256"
 
+# Decoded tokens, keyed by the raw token string, kept until they expire
+TOKEN_CACHE_SIZE = 1024
+_token_cache = OrderedDict()
+
 # Database connection
 async def get_database():
     # Import database from the main app module
     from app.mongodb import database
     return database
 
-def check_rate_limit(user_identifier: str):
-    """Check if user has exceeded rate limit"""
-    current_time = time.time()
-    
-    # Clean old requests (outside the window)
-    user_requests[user_identifier] = [
-        req_time for req_time in user_requests[user_identifier]
-        if current_time - req_time < RATE_WINDOW
-    ]
-    
-    # Check if user has exceeded the limit
-    if len(user_requests[user_identifier]) >= RATE_LIMIT:
-        return False
-    
-    # Add current request
-    user_requests[user_identifier].append(current_time)
-    return True
+def decode_access_token(token: str) -> dict:
+    """Verify and decode a token, reusing earlier decodes of the same token until it expires."""
+    cached = _token_cache.get(token)
+    if cached is not None:
+        if cached.get("exp", 0) > time.time():
+            _token_cache.move_to_end(token)
+            return cached
+        del _token_cache[token]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    _token_cache[token] = payload
+    if len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return payload
+
+def get_token_claims(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[dict]:
+    """
+    Claims of the bearer token, or None for guests. These routes work without
+    signing in, so an expired or invalid token is treated as a guest rather than
+    a 401: the frontend keeps a stored token after it expires.
+    """
+    if credentials is None:
+        return None
+    try:
+        payload = decode_access_token(credentials.credentials)
+    except jwt.PyJWTError:
+        return None
+    if payload.get("sub") is None:
+        return None
+    return payload
 
 def get_user_identifier(request):
     """Extract user identifier from request"""
@@ -51,7 +69,7 @@ def get_user_identifier(request):
     if auth_header and auth_header.startswith("Bearer "):
         try:
             token = auth_header.split(" ")[1]
-            decoded = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            decoded = decode_access_token(token)
             return decoded.get("sub", "anonymous")
         except:
             pass
@@ -73,6 +91,15 @@ class UserSignup(BaseModel):
     role: Optional[str] = "user"  # Default role is "user"
     remember_me: Optional[bool] = False
 
+class UserBulkDelete(BaseModel):
+    ids: Optional[list[str]] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+    since: Optional[datetime] = None  # created_at range, since inclusive
+    until: Optional[datetime] = None
+    all: bool = False  # required to delete with neither ids nor a filter
+    dry_run: bool = False
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -83,13 +110,9 @@ class Token(BaseModel):
 async def signup(user_data: UserSignup, request: Request):
     db = await get_database()
     
-    # Rate limiting check
+    # Rate limiting check (the "auth" policy in model_config.yaml, shared by signup and login)
     user_id = get_user_identifier(request)
-    if not check_rate_limit(user_id):
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. Maximum {RATE_LIMIT} requests per {RATE_WINDOW//3600} hours."
-        )
+    await rate_limiter.enforce("auth", user_id, route="/api/auth/signup")
     
     # Debug logs
     print(f"=== BACKEND SIGNUP DEBUG ===")
@@ -108,33 +131,29 @@ async def signup(user_data: UserSignup, request: Request):
             detail="Submission ID is required"
         )
     
-    # Check if submission ID already exists
-    existing_submission = await db.users.find_one({"submission_id": user_data.submission_id})
-    if existing_submission:
+    email = user_data.email.strip() if user_data.email and user_data.email.strip() else f"user-{user_data.submission_id}@echoai.local"  # Use unique email for empty email
+
+    # Cheap indexed lookup so an obvious duplicate is rejected before paying for bcrypt;
+    # the unique indexes still decide when two signups race
+    with span("user_lookup"), mongo_op_seconds.time(operation="users.find_one"):
+        existing = await db.users.find_one(
+            {"$or": [{"submission_id": user_data.submission_id}, {"email": email}]},
+            {"submission_id": 1},
+        )
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Submission ID already registered"
+            detail="Submission ID already registered" if existing.get("submission_id") == user_data.submission_id else "Email already registered"
         )
-    
-    # Check if email already exists (only if email is provided and not empty)
-    if user_data.email and user_data.email.strip():
-        print(f"Checking for duplicate email: '{user_data.email}'")
-        existing_user = await db.users.find_one({"email": user_data.email})
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-    else:
-        print(f"Skipping email check - email is empty or None")
-    
+
     # Hash password if provided, otherwise use default
     password_to_hash = user_data.password if user_data.password else 'defaultpassword'
-    hashed_password = bcrypt.hashpw(password_to_hash.encode('utf-8'), bcrypt.gensalt())
+    with span("bcrypt"):
+        hashed_password = await password_hasher.hash(password_to_hash)
     
     # Store user
     user_doc = {
-        "email": user_data.email.strip() if user_data.email and user_data.email.strip() else f"user-{user_data.submission_id}@echoai.local",  # Use unique email for empty email
+        "email": email,
         "password": hashed_password,
         "full_name": user_data.full_name,
         "submission_id": user_data.submission_id,
@@ -143,14 +162,29 @@ async def signup(user_data: UserSignup, request: Request):
         "updated_at": datetime.utcnow()
     }
     
-    result = await db.users.insert_one(user_doc)
+    # Duplicate submission IDs / emails are rejected by the unique indexes on users
+    try:
+        with span("user_insert"), mongo_op_seconds.time(operation="users.insert_one"):
+            result = await db.users.insert_one(user_doc)
+    except DuplicateKeyError as e:
+        key_pattern = (e.details or {}).get("keyPattern") or {}
+        duplicate_submission = "submission_id" in key_pattern or "submission_id" in str(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Submission ID already registered" if duplicate_submission else "Email already registered"
+        )
     user_id = str(result.inserted_id)
     
     # Create token
     access_token_expires = timedelta(days=7 if user_data.remember_me else 1)
     email_for_token = user_data.email.strip() if user_data.email and user_data.email.strip() else f"user-{user_data.submission_id}@echoai.local"
     access_token = create_access_token(
-        data={"sub": user_id, "email": email_for_token}, 
+        data={
+            "sub": user_id,
+            "email": email_for_token,
+            "submission_id": user_data.submission_id,
+            "role": user_data.role or "user",
+        },
         expires_delta=access_token_expires
     )
     
@@ -160,22 +194,20 @@ async def signup(user_data: UserSignup, request: Request):
 async def login(user_data: UserLogin, request: Request):
     db = await get_database()
     
-    # Rate limiting check
+    # Rate limiting check (the "auth" policy in model_config.yaml, shared by signup and login)
     user_id = get_user_identifier(request)
-    if not check_rate_limit(user_id):
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. Maximum {RATE_LIMIT} requests per {RATE_WINDOW//3600} hours."
-        )
+    await rate_limiter.enforce("auth", user_id, route="/api/auth/login")
     
     # Check if user exists by submission_id or email
     user = None
     if user_data.submission_id:
         # Try to find user by submission_id first
-        user = await db.users.find_one({"submission_id": user_data.submission_id})
+        with span("user_lookup"), mongo_op_seconds.time(operation="users.find_one"):
+            user = await db.users.find_one({"submission_id": user_data.submission_id})
     elif user_data.email:
         # Fallback to email lookup
-        user = await db.users.find_one({"email": user_data.email})
+        with span("user_lookup"), mongo_op_seconds.time(operation="users.find_one"):
+            user = await db.users.find_one({"email": user_data.email})
     
     if not user:
         raise HTTPException(
@@ -184,16 +216,27 @@ async def login(user_data: UserLogin, request: Request):
         )
     
     # Check password if provided, otherwise allow login
-    if user_data.password and not bcrypt.checkpw(user_data.password.encode('utf-8'), user["password"]):
+    with span("bcrypt"):
+        password_ok = not user_data.password or await password_hasher.verify(user_data.password, user["password"])
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
+
+    # Hashes made with an older BCRYPT_ROUNDS are upgraded now that we know the password
+    if user_data.password and password_hasher.needs_rehash(user["password"]):
+        password_hasher.schedule_rehash(db.users, user["_id"], user_data.password, user["password"])
     
     # Create token
     access_token_expires = timedelta(days=7 if user_data.remember_me else 1)
     access_token = create_access_token(
-        data={"sub": str(user["_id"]), "email": user["email"]}, 
+        data={
+            "sub": str(user["_id"]),
+            "email": user["email"],
+            "submission_id": user.get("submission_id"),
+            "role": user.get("role", "user"),
+        },
         expires_delta=access_token_expires
     )
     
@@ -263,10 +306,50 @@ async def delete_user(user_id: str):
     
     return {"message": f"User {user_id} deleted successfully"}
 
+@router.post("/users/bulk-delete")
+async def bulk_delete_users(req: UserBulkDelete):
+    """Delete users by id list and/or filter in a single delete_many; dry_run only counts."""
+    db = await get_database()
+
+    query = {}
+    if req.ids is not None:
+        try:
+            query["_id"] = {"$in": [ObjectId(user_id) for user_id in req.ids]}
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid user ID format"
+            )
+    if req.email:
+        query["email"] = req.email
+    if req.role:
+        query["role"] = req.role
+    created = {}
+    if req.since:
+        created["$gte"] = naive_utc(req.since)
+    if req.until:
+        created["$lt"] = naive_utc(req.until)
+    if created:
+        query["created_at"] = created
+    if not query and not req.all:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass ids, a filter, or all=true"
+        )
+
+    if req.dry_run:
+        with mongo_op_seconds.time(operation="users.count_documents"):
+            count = await db.users.count_documents(query)
+        return {"dry_run": True, "matched_count": count}
+
+    with mongo_op_seconds.time(operation="users.delete_many"):
+        result = await db.users.delete_many(query)
+    return {"dry_run": False, "deleted_count": result.deleted_count}
+
 @router.get("/me")
 async def get_current_user(token: str = Depends(security)):
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token.credentials)
         user_id: str = payload.get("sub")
         email: str = payload.get("email")
         if user_id is None:
@@ -274,7 +357,12 @@ async def get_current_user(token: str = Depends(security)):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials"
             )
-        return {"user_id": user_id, "email": email}
+        return {
+            "user_id": user_id,
+            "email": email,
+            "submission_id": payload.get("submission_id"),
+            "role": payload.get("role", "user"),
+        }
     except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
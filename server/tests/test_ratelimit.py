@@ -0,0 +1,42 @@
+import asyncio
+
+from app.ratelimit import RateLimiter
+
+
+def limiter(capacity: float) -> RateLimiter:
+    rl = RateLimiter()
+    rl.settings = lambda: {
+        "backend": "memory",
+        "policies": {"interpret": {"capacity": capacity, "per_seconds": 3600}},
+    }
+    return rl
+
+
+def tokens(rl: RateLimiter, key: str) -> float:
+    # A bucket that is full again is evicted, which is the same as full
+    entry = rl._memory._buckets.get(("interpret", key))
+    return entry[0] if entry else rl.policy("interpret").capacity
+
+
+def test_batch_larger_than_capacity_settles_against_charged_cost():
+    rl = limiter(50_000)
+
+    async def batch():
+        # Estimate 100k only reserves the full 50k bucket; 80k actually used
+        decision = await rl.enforce("interpret", "ip:1", route="/api/interpret/batch", cost=100_000)
+        assert decision.charged == 50_000
+        await rl.adjust("interpret", "ip:1", 80_000 - decision.charged)
+
+    asyncio.run(batch())
+    assert tokens(rl, "ip:1") <= -29_999
+
+
+def test_refund_returns_only_what_was_charged():
+    rl = limiter(50_000)
+
+    async def failed_batch():
+        decision = await rl.enforce("interpret", "ip:2", route="/api/interpret/batch", cost=100_000)
+        await rl.adjust("interpret", "ip:2", -decision.charged)
+
+    asyncio.run(failed_batch())
+    assert 49_999 <= tokens(rl, "ip:2") <= 50_000
@@ -16,7 +16,7 @@ import { AuthProvider, useAuth } from './contexts/AuthContext'
 import styles from './App.module.css'
 
 function HomePage() {
-  const { user } = useAuth()  // Move this to the top level
+  const { user, token } = useAuth()  // Move this to the top level
   const [inputText, setInputText] = useState('')
   const [outputText, setOutputText] = useState('')
   const [isLoading, setIsLoading] = useState(false)
@@ -53,26 +53,58 @@ function HomePage() {
     setOptionError('')
     setIsLoading(true)
 
-    const userId = user?.id || null  // Use user from the top level
     console.log("[DEBUG] Model sent to API:", selectedModel)
 
-    const res = await fetch("/api/interpret", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({
-        text: inputText,
-        options,
-        model: selectedModel,
-        user_info: user ? {
-          id: user.id,
-          email: user.email
-        } : {}  // Send user info if logged in, empty object for guests
-      }),
-    })
+    setOutputText('')
+
+    try {
+      const res = await fetch("/api/interpret/stream", {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          // Records are attributed from the token; guests send no Authorization header
+          ...(token ? { Authorization: `Bearer ${token}` } : {})
+        },
+        body: JSON.stringify({
+          text: inputText,
+          options,
+          model: selectedModel
+        }),
+      })
 
-    const data = await res.json()
-    setIsLoading(false)
-    setOutputText(data.output || data.detail || "")
+      if (!res.ok) {
+        const data = await res.json()
+        setOutputText(data.detail || "")
+        return
+      }
+
+      // Server-Sent Events: each "data: {...}" line carries a delta, an error, or the final output
+      const reader = res.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let streamed = ''
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const events = buffer.split('\n\n')
+        buffer = events.pop()
+        for (const evt of events) {
+          if (!evt.startsWith('data: ')) continue
+          const data = JSON.parse(evt.slice(6))
+          if (data.delta) {
+            streamed += data.delta
+            setOutputText(streamed)
+          } else if (data.done) {
+            setOutputText(data.output)
+          } else if (data.error) {
+            setOutputText(data.error)
+          }
+        }
+      }
+    } finally {
+      setIsLoading(false)
+    }
   }
 
   function handleClear() {
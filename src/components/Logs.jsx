@@ -7,6 +7,8 @@ export default function Logs() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const [searchTerm, setSearchTerm] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const { user } = useAuth()
 
   useEffect(() => {
@@ -16,10 +18,11 @@ export default function Logs() {
   const fetchLogs = async () => {
     try {
       setLoading(true)
-      const response = await fetch('http://localhost:8000/api/feedback-records')
+      const response = await fetch('http://localhost:8000/api/feedback-records?limit=50')
       if (response.ok) {
         const data = await response.json()
-        setLogs(data)
+        setLogs(data.records)
+        setNextCursor(data.next_cursor)
       } else {
         setError('Failed to fetch logs')
       }
@@ -30,6 +33,25 @@ export default function Logs() {
     }
   }
 
+  const loadMoreLogs = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const response = await fetch(`http://localhost:8000/api/feedback-records?limit=50&cursor=${encodeURIComponent(nextCursor)}`)
+      if (response.ok) {
+        const data = await response.json()
+        setLogs(prev => [...prev, ...data.records])
+        setNextCursor(data.next_cursor)
+      } else {
+        alert('Failed to load more logs')
+      }
+    } catch (err) {
+      alert('Error loading more logs')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const deleteLog = async (logId) => {
     if (!window.confirm('Are you sure you want to delete this log?')) {
       return
@@ -56,14 +78,19 @@ export default function Logs() {
     }
     
     try {
-      const deletePromises = logs.map(log => 
-        fetch(`http://localhost:8000/api/feedback-records/${log.id}`, {
-          method: 'DELETE'
-        })
-      )
-      
-      await Promise.all(deletePromises)
-      setLogs([])
+      // One bulk request covers every record, including pages not loaded yet
+      const response = await fetch('http://localhost:8000/api/feedback-records/bulk-delete', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ all: true })
+      })
+
+      if (response.ok) {
+        setLogs([])
+        setNextCursor(null)
+      } else {
+        alert('Failed to delete logs')
+      }
     } catch (err) {
       alert('Error deleting logs')
     }
@@ -238,6 +265,12 @@ export default function Logs() {
                 ))}
               </div>
             )}
+
+            {nextCursor && (
+              <button className={styles.refreshButton} onClick={loadMoreLogs} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </button>
+            )}
           </div>
         </div>
     </div>
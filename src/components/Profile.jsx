@@ -7,6 +7,8 @@ export default function Profile() {
   const [feedbacks, setFeedbacks] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const { user } = useAuth()
   const navigate = useNavigate()
 
@@ -18,16 +20,20 @@ export default function Profile() {
     fetchUserFeedbacks()
   }, [user, navigate])
 
+  const userRecordsUrl = (cursor) => {
+    const params = new URLSearchParams({ user: user.email, limit: '50' })
+    if (cursor) params.set('cursor', cursor)
+    return `http://localhost:8000/api/feedback-records?${params}`
+  }
+
   const fetchUserFeedbacks = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/feedback-records')
+      // Filtered server-side so only this user's records are sent
+      const response = await fetch(userRecordsUrl())
       if (response.ok) {
         const data = await response.json()
-        // Filter feedbacks for current user
-        const userFeedbacks = data.filter(feedback => 
-          feedback.user_email === user.email
-        )
-        setFeedbacks(userFeedbacks)
+        setFeedbacks(data.records)
+        setNextCursor(data.next_cursor)
       } else {
         setError('Failed to fetch feedback records')
       }
@@ -38,6 +44,23 @@ export default function Profile() {
     }
   }
 
+  const loadMoreFeedbacks = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const response = await fetch(userRecordsUrl(nextCursor))
+      if (response.ok) {
+        const data = await response.json()
+        setFeedbacks(prev => [...prev, ...data.records])
+        setNextCursor(data.next_cursor)
+      }
+    } catch (err) {
+      setError('Network error. Please check your connection.')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const formatDate = (dateString) => {
     if (!dateString) return 'N/A'
     return new Date(dateString).toLocaleDateString('en-US', {
@@ -169,6 +192,12 @@ export default function Profile() {
                 </div>
               ))}
             </div>
+
+            {nextCursor && (
+              <button className={styles.refreshButton} onClick={loadMoreFeedbacks} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </button>
+            )}
           </div>
         )}
       </div>
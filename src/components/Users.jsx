@@ -69,14 +69,17 @@ export default function Users() {
     }
     
     try {
-      const deletePromises = users.map(user => 
-        fetch(`http://localhost:8000/api/auth/users/${user._id}`, {
-          method: 'DELETE'
-        })
-      )
-      
-      await Promise.all(deletePromises)
-      setUsers([])
+      const response = await fetch('http://localhost:8000/api/auth/users/bulk-delete', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ids: users.map(user => user._id) })
+      })
+
+      if (response.ok) {
+        setUsers([])
+      } else {
+        alert('Failed to delete users')
+      }
     } catch (err) {
       alert('Error deleting users')
     }